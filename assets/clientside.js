@@ -0,0 +1,112 @@
+/*
+BEAT visualization tool - Clientside callbacks
+
+Purely presentational callbacks run in the browser, so they do not queue behind
+the heavy server callbacks.
+*/
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    beat: {
+
+        // Show the variable selector only for the statistics that need a variable
+        toggle_var_selector: function(selected_stat, current_style) {
+            const style = Object.assign({}, current_style);
+            style.display = ['measure', 'phases', 'beats'].includes(selected_stat) ? 'block' : 'none';
+            return style;
+        },
+
+        // Copy the x-axis range into zoom-store. Relayout events are debounced, so a
+        // zoom/pan gesture only updates the store (and the callbacks behind it) once.
+        update_zoom_range: function(relayout_data, current_zoom) {
+            if (!relayout_data) {
+                return window.dash_clientside.no_update;
+            }
+
+            let zoom;
+            if ('xaxis.range[0]' in relayout_data && 'xaxis.range[1]' in relayout_data) {
+                zoom = {'x_min': relayout_data['xaxis.range[0]'], 'x_max': relayout_data['xaxis.range[1]']};
+            } else if ('xaxis.autorange' in relayout_data) {
+                zoom = null;
+            } else {
+                return window.dash_clientside.no_update;
+            }
+
+            const beat = window.dash_clientside.beat;
+            clearTimeout(beat.zoom_timer);
+            beat.zoom_timer = setTimeout(function() {
+                if (JSON.stringify(zoom) !== JSON.stringify(beat.last_zoom === undefined ? current_zoom : beat.last_zoom)) {
+                    beat.last_zoom = zoom;
+                    window.dash_clientside.set_props('zoom-store', {data: zoom});
+                }
+            }, 300);
+            return window.dash_clientside.no_update;
+        },
+
+        // Link of the export route for the zoom range and the selected variables
+        update_export_link: function(zoom_range, columns, fmt) {
+            const params = new URLSearchParams({'format': fmt});
+            (columns || []).forEach(function(column) { params.append('col', column); });
+            if (zoom_range) {
+                params.append('x_min', zoom_range.x_min);
+                params.append('x_max', zoom_range.x_max);
+            }
+            return '/export?' + params.toString();
+        },
+
+        // Move the plot to a message search hit ("start_ms,end_ms"), with some margin around it
+        jump_to_hit: function(hit, figure) {
+            if (!hit) {
+                return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+            }
+            const [start_ms, end_ms] = hit.split(',').map(Number);
+            const margin = Math.max((end_ms - start_ms) / 1000, 10);
+            const zoom = {'x_min': start_ms / 1000 - margin, 'x_max': end_ms / 1000 + margin};
+
+            const xaxis = Object.assign({}, figure.layout.xaxis, {range: [zoom.x_min, zoom.x_max], autorange: false});
+            const layout = Object.assign({}, figure.layout, {xaxis: xaxis});
+            window.dash_clientside.beat.last_zoom = zoom;
+            return [Object.assign({}, figure, {layout: layout}), zoom];
+        },
+
+        // Show / hide the inflation phase and message overlays without resending the traces
+        update_overlays: function(inf_clicks, alarm_clicks, ui_clicks, wire_clicks, phases, alarms, uis, wires, figure) {
+            const shapes = [];
+            const annotations = [];
+            const yaxis = figure.layout.yaxis || {};
+            const label_y = (yaxis.range ? yaxis.range[1] : 1) * 0.9;
+
+            function add_area(x0, x1, color, label, font_color, y, angle) {
+                shapes.push({
+                    type: 'rect', x0: x0, x1: x1, y0: 0, y1: 1, xref: 'x', yref: 'paper',
+                    fillcolor: color, opacity: 0.2, layer: 'below', name: 'highlighted_area'
+                });
+                if (label) {
+                    const annotation = {
+                        x: (x0 + x1) / 2, y: y, text: label, showarrow: false,
+                        font: {size: 14, color: font_color}, align: 'center', bgcolor: color, opacity: 0.8
+                    };
+                    if (angle) { annotation.textangle = angle; }
+                    annotations.push(annotation);
+                }
+            }
+
+            if (inf_clicks % 2) {
+                [['inflation', 'darkred'], ['deflation', 'darkblue'], ['pause', 'gray']].forEach(function([phase, color]) {
+                    (phases[phase] || []).forEach(function(event) {
+                        add_area(event.start_time, event.end_time, color, phase, 'white', label_y);
+                    });
+                });
+            }
+            [[alarm_clicks, alarms, 'yellow'], [ui_clicks, uis, 'lightblue'], [wire_clicks, wires, 'deeppink']].forEach(function([clicks, events, color]) {
+                if (clicks % 2) {
+                    (events || []).forEach(function(event) {
+                        add_area(event.start, event.end, color, event.alarm, 'black', 400, 90);
+                    });
+                }
+            });
+
+            const layout = Object.assign({}, figure.layout, {shapes: shapes, annotations: annotations});
+            return Object.assign({}, figure, {layout: layout});
+        }
+    }
+});
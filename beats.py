@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:40:27 2026
+
+@author: agent
+
+BEAT - Beat detection
+
+Beats are detected in the fast pressure channels with vectorized peak finding. The
+recording is processed in overlapping chunks, and the per-beat metrics (systolic,
+diastolic, MAP, interval) are saved as a beat table next to the preprocessed file.
+Statistics of a zoom window are then computed from the beat table only.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import timebase
+
+beat_channels = ["Tip, fast", "Balloon, fast"]
+
+min_interval = 0.3      # Shortest beat interval (s), i.e. 200 bpm
+max_interval = 2.0      # Longest beat interval (s), i.e. 30 bpm
+min_amplitude = 5       # Smallest systolic - diastolic difference of a beat
+relative_amplitude = 0.5    # Smallest rise of a peak relative to the median beat of the chunk
+chunk_rows = 500000     # Rows processed at once
+
+beat_table_columns = ["channel", "sample", "time", "systolic", "diastolic", "map", "interval", "bpm"]
+
+def beats_path(preproc_path):
+    return preproc_path.replace("_PREPROC.gz", "_beats.csv")
+
+def local_peaks(values, min_rows):
+    '''
+    Rows of the local maxima that are at least min_rows apart (the higher one is kept) and rise high enough
+    above the preceding trough. Plateaus are reduced to their first row.
+    '''
+    if len(values) < 3:
+        return np.array([], dtype=np.int64)
+
+    # Runs of equal values, so a flat top is one candidate
+    run_starts = np.concatenate(([0], np.flatnonzero(np.diff(values) != 0) + 1))
+    run_values = values[run_starts]
+    is_peak = (run_values[1:-1] > run_values[:-2]) & (run_values[1:-1] > run_values[2:])
+    peaks = run_starts[1:-1][is_peak]
+
+    # Drop the lower peak of every pair that is too close, until no such pair is left
+    while len(peaks) > 1:
+        close = np.flatnonzero(np.diff(peaks) < min_rows)
+        if not len(close):
+            break
+        lower = np.where(values[peaks[close]] < values[peaks[close + 1]], close, close + 1)
+        peaks = np.delete(peaks, np.unique(lower))
+
+    # Drop the ripples: peaks that rise less above the preceding trough than a fraction of the typical beat
+    while len(peaks) > 2:
+        rises = values[peaks[1:]] - np.minimum.reduceat(values, peaks)[:-1]
+        keep = np.concatenate(([True], rises >= max(min_amplitude, relative_amplitude * np.median(rises))))
+        if keep.all():
+            break
+        peaks = peaks[keep]
+    return peaks
+
+def find_peaks(values, fs_index, start=0, end=None):
+    '''
+    Rows of the systolic peaks in values[start:end], processed in overlapping chunks.
+    The overlap is longer than a beat, so a peak at the edge of a chunk is found in the next one with the same neighbours.
+    '''
+    end = len(values) if end is None else end
+    min_rows = int(min_interval * fs_index)
+    overlap = int(2 * max_interval * fs_index)
+    peaks = []
+    for chunk_start in range(start, end, chunk_rows):
+        chunk_end = min(chunk_start + chunk_rows, end)
+        window_start, window_end = max(start, chunk_start - overlap), min(end, chunk_end + overlap)
+        rows = window_start + local_peaks(values[window_start:window_end], min_rows)
+        peaks.append(rows[(rows >= chunk_start) & (rows < chunk_end)])
+    return np.concatenate(peaks) if peaks else np.array([], dtype=np.int64)
+
+def beat_metrics(values, peaks, fs_index):
+    '''
+    Metrics of the beats between consecutive peaks: the beat ends at its systolic peak and starts at the previous one.
+    Diastolic is the minimum and MAP is the mean pressure of the cycle (reduceat over all beats at once).
+    '''
+    if len(peaks) < 2:
+        return np.empty((0, 5))
+    values = values.astype(float)
+
+    # Beats that are too short or too long (e.g. missed peaks) are dropped
+    intervals = np.diff(peaks) / fs_index
+    diastolic = np.minimum.reduceat(values, peaks)[:-1]
+    means = np.add.reduceat(values, peaks)[:-1] / np.diff(peaks)
+    systolic = values[peaks[1:]]
+    valid = (intervals <= max_interval) & (systolic - diastolic >= min_amplitude)
+
+    return np.column_stack((peaks[1:], systolic, diastolic, means, intervals))[valid]
+
+def compute_beats(df_num, fs_index, sections=None, tb=None):
+    '''
+    Beat table of every fast pressure channel of a recording. Beats are not allowed to span a gap.
+    tb: time base of the recording (built from the index if not given).
+    '''
+    if tb is None:
+        tb = timebase.TimeBase.from_index(df_num.index, fs_index)
+    bounds = timebase.continuous_bounds(sections, df_num.index) if sections is not None else [(0, len(df_num))]
+
+    tables = []
+    for channel in [column for column in beat_channels if column in df_num]:
+        values = df_num[channel].to_numpy()
+        metrics = [beat_metrics(values, find_peaks(values, fs_index, start, end), fs_index) for start, end in bounds]
+        metrics = np.concatenate(metrics) if metrics else np.empty((0, 5))
+        rows = metrics[:, 0].astype(np.int64)
+        tables.append(pd.DataFrame({
+            "channel": channel,
+            "sample": df_num.index.to_numpy()[rows],
+            "time": tb.time(rows),
+            "systolic": metrics[:, 1],
+            "diastolic": metrics[:, 2],
+            "map": metrics[:, 3].round(2),
+            "interval": metrics[:, 4],
+            "bpm": (60 / metrics[:, 4]).round(1),
+        }))
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=beat_table_columns)
+
+def export_beats(beats, file_path):
+
+    beats.to_csv(file_path, index=False, sep=";")
+    print(f"Beat table successfully exported to {file_path}")
+
+def load_beats(preproc_path, df_num=None, fs_index=50, sections=None, tb=None):
+    '''
+    Read the beat table of a preprocessed file. If it is missing, it is computed from the data and saved.
+    '''
+    file_path = beats_path(preproc_path)
+    if os.path.exists(file_path):
+        return pd.read_csv(file_path, sep=";")
+
+    if df_num is None:
+        return None
+    print("The beat table is not found. A new version will be created.")
+    beats = compute_beats(df_num, fs_index, sections, tb)
+    export_beats(beats, file_path)
+    return beats
+
+def channel_beats(beats, channel):
+    '''
+    Beat table of one channel, as a dict of arrays sorted by time (computed once per channel).
+    '''
+    table = beats[beats["channel"] == channel].sort_values("time")
+    return {column: table[column].to_numpy() for column in beat_table_columns[1:]}
+
+def window_stats(table, x_min=None, x_max=None):
+    '''
+    Statistics of the beats in the [x_min, x_max] time range, using a binary search on the beat times.
+    '''
+    start = 0 if x_min is None else np.searchsorted(table["time"], x_min, side="left")
+    stop = len(table["time"]) if x_max is None else np.searchsorted(table["time"], x_max, side="right")
+    if stop <= start:
+        return None
+
+    stats = {"beats": int(stop - start)}
+    for column in ["systolic", "diastolic", "map", "bpm"]:
+        values = table[column][start:stop]
+        stats[column] = {"mean": round(float(values.mean()), 2), "min": float(values.min()),
+                         "max": float(values.max()), "std": round(float(values.std()), 2)}
+    return stats
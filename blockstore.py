@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:43:28 2026
+
+@author: agent
+
+BEAT - Block-compressed column store
+
+The preprocessed data is stored in a directory with one file per column. Every column is
+split into blocks of rows that are compressed separately, and a manifest keeps the offset
+of every block. Blocks are compressed and decompressed by a thread pool (zlib and zstd
+release the GIL), and a single block of a column can be read without touching the rest.
+Derived signals can be stored next to the columns (in the "derived" group of the manifest),
+they are removed when the frame is written again.
+"""
+
+import os
+import glob
+import json
+import importlib.util
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import timebase
+
+block_rows = 262144     # Rows per compressed block
+zlib_level = 3          # Faster than the gzip default (6), the files are slightly larger
+max_workers = os.cpu_count() or 1
+store_version = 1
+
+# zstd is optional, it is only used if the zstandard package is installed
+codecs = ["zlib", "zstd"]
+default_codec = "zstd" if importlib.util.find_spec("zstandard") else "zlib"
+
+def manifest_path(directory):
+    return os.path.join(directory, "manifest.json")
+
+def exists(directory):
+    # The manifest is written last, so a partially written store is not used
+    return os.path.exists(manifest_path(directory))
+
+def compress(data, codec):
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, zlib_level)
+
+def decompress(data, codec):
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+def encode(values):
+    '''
+    Bytes of a block: the raw array of a numeric column, or a JSON list of a text column.
+    Empty strings are stored as missing values (null), like in the CSV files.
+    '''
+    if values.dtype == object:
+        return json.dumps([value if isinstance(value, str) and value else None for value in values]).encode("utf-8")
+    return np.ascontiguousarray(values).tobytes()
+
+def write_frame(directory, df, codec=None):
+    '''
+    Write the columns (and the index) of a DataFrame into a block store directory.
+    '''
+    codec = codec or default_codec
+    if codec not in codecs:
+        raise ValueError(f"Unsupported codec: {codec}")
+    os.makedirs(directory, exist_ok=True)
+    if exists(directory):
+        os.remove(manifest_path(directory))
+    for file_path in glob.glob(os.path.join(directory, "*.bin")):
+        os.remove(file_path)    # Columns and derived signals of the previous version
+
+    # A continuous index is stored by its range only
+    index = timebase.compact_index(df.index)
+    arrays = {} if isinstance(index, pd.RangeIndex) else {"__index__": index.to_numpy()}
+    arrays.update({column: df[column].to_numpy() for column in df.columns})
+    starts = range(0, len(df), block_rows)
+
+    # Compress every block of every column in parallel (map keeps the order)
+    jobs = [(array, start) for array in arrays.values() for start in starts]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        blocks = iter(executor.map(lambda job: compress(encode(job[0][job[1]:job[1] + block_rows]), codec), jobs))
+
+        columns = {}
+        for i, (name, array) in enumerate(arrays.items()):
+            file_name = f"column_{i}.bin"
+            offsets = []
+            with open(os.path.join(directory, file_name), mode="wb") as file:
+                for _ in starts:
+                    block = next(blocks)
+                    offsets.append([file.tell(), len(block)])
+                    file.write(block)
+            columns[name] = {"file": file_name, "dtype": "object" if array.dtype == object else array.dtype.str, "blocks": offsets}
+
+    manifest = {
+        "version": store_version,
+        "codec": codec,
+        "rows": len(df),
+        "block_rows": block_rows,
+        "index": {"name": df.index.name, "start": int(index.start) if isinstance(index, pd.RangeIndex) else None},
+        "columns": columns,
+        "derived": {},
+    }
+    write_manifest(directory, manifest)
+
+def write_manifest(directory, manifest):
+    
+    # Written to a temporary file and renamed, so a reader never sees a partial manifest
+    temp_path = manifest_path(directory) + ".tmp"
+    with open(temp_path, mode="w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(temp_path, manifest_path(directory))
+
+def write_column(directory, name, values, group="derived"):
+    '''
+    Add (or replace) a single column of a stored frame, e.g. a derived signal. The other columns are not touched.
+    '''
+    manifest = read_manifest(directory)
+    if len(values) != manifest["rows"]:
+        raise ValueError(f"{name} has {len(values)} rows, the store has {manifest['rows']}")
+    codec = manifest["codec"]
+    
+    # The replaced file is only removed after the new manifest is written
+    values = np.asarray(values)
+    n = 0
+    while os.path.exists(os.path.join(directory, f"{group}_{n}.bin")):
+        n += 1
+    file_name = f"{group}_{n}.bin"
+    starts = range(0, len(values), manifest["block_rows"])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        blocks = list(executor.map(lambda start: compress(encode(values[start:start + manifest["block_rows"]]), codec), starts))
+    offsets = []
+    with open(os.path.join(directory, file_name), mode="wb") as file:
+        for block in blocks:
+            offsets.append([file.tell(), len(block)])
+            file.write(block)
+    
+    old = manifest.setdefault(group, {}).get(name)
+    manifest[group][name] = {"file": file_name, "dtype": "object" if values.dtype == object else values.dtype.str,
+                             "blocks": offsets}
+    write_manifest(directory, manifest)
+    if old:
+        os.remove(os.path.join(directory, old["file"]))
+
+def read_manifest(directory):
+
+    with open(manifest_path(directory), mode="r", encoding="utf-8") as file:
+        return json.load(file)
+
+def column_names(directory, manifest=None):
+    manifest = manifest or read_manifest(directory)
+    return [name for name in manifest["columns"] if name != "__index__"]
+
+def read_block(directory, column, i, manifest=None, group="columns"):
+    '''
+    Values of a single block of a column (random access, only this block is read and decompressed).
+    '''
+    manifest = manifest or read_manifest(directory)
+    entry = manifest[group][column]
+    offset, length = entry["blocks"][i]
+    with open(os.path.join(directory, entry["file"]), mode="rb") as file:
+        file.seek(offset)
+        data = decompress(file.read(length), manifest["codec"])
+    if entry["dtype"] == "object":
+        return np.array([np.nan if value is None else value for value in json.loads(data)], dtype=object)
+    return np.frombuffer(data, dtype=entry["dtype"])
+
+def read_columns(directory, columns=None, manifest=None, group="columns"):
+    '''
+    Arrays of the selected columns (all columns by default). Blocks are decompressed by a thread pool directly
+    into the preallocated column arrays, there is no concatenation.
+    group: "columns" (the stored frame) or "derived" (the stored derived signals).
+    '''
+    manifest = manifest or read_manifest(directory)
+    columns = column_names(directory, manifest) if columns is None else columns
+    entries = manifest.get(group, {})
+    missing = [column for column in columns if column not in entries]
+    if missing:
+        raise KeyError(f"Columns not found in {directory}: {missing}")
+
+    n_rows, rows = manifest["rows"], manifest["block_rows"]
+    arrays = {column: np.empty(n_rows, dtype=entries[column]["dtype"]) for column in columns}
+
+    def load(job):
+        column, i = job
+        arrays[column][i * rows:(i + 1) * rows] = read_block(directory, column, i, manifest, group)
+
+    jobs = [(column, i) for column in columns for i in range(len(entries[column]["blocks"]))]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(load, jobs))
+    return arrays
+
+def read_index(directory, manifest=None):
+    '''
+    Index of the stored frame (a RangeIndex if it is continuous).
+    '''
+    manifest = manifest or read_manifest(directory)
+    name, start = manifest["index"]["name"], manifest["index"]["start"]
+    if start is not None:
+        return pd.RangeIndex(start, start + manifest["rows"], name=name)
+    return pd.Index(read_columns(directory, ["__index__"], manifest)["__index__"], name=name)
+
+def read_frame(directory, columns=None):
+    '''
+    DataFrame of the selected columns of a block store.
+    '''
+    manifest = read_manifest(directory)
+    return pd.DataFrame(read_columns(directory, columns, manifest), index=read_index(directory, manifest))
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:12:40 2026
+
+@author: agent
+
+BEAT - Least recently used cache with a byte budget
+
+Used for the data that is computed or read on request (derived signals, compared columns).
+The least recently used items are evicted when the total size exceeds the budget.
+"""
+
+from collections import OrderedDict
+
+class ByteCache:
+    '''
+    Cache of arrays (or tuples of arrays) limited by their total size in bytes.
+    '''
+    def __init__(self, budget):
+        self.budget = budget
+        self.items = OrderedDict()
+        self.size = 0
+
+    @staticmethod
+    def nbytes(item):
+        return sum(part.nbytes for part in item) if isinstance(item, tuple) else item.nbytes
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key, default=None):
+        if key not in self.items:
+            return default
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key, item):
+        self.pop(key)
+        self.items[key] = item
+        self.size += self.nbytes(item)
+
+        # Evict the least recently used items (the new item is kept even if it is larger than the budget)
+        while self.size > self.budget and len(self.items) > 1:
+            _, evicted = self.items.popitem(last=False)
+            self.size -= self.nbytes(evicted)
+
+    def pop(self, key):
+        if key in self.items:
+            self.size -= self.nbytes(self.items.pop(key))
+
+    def clear(self, select=None):
+        '''
+        Remove every item, or the items whose key is selected by the function.
+        '''
+        for key in [key for key in self.items if select is None or select(key)]:
+            self.pop(key)
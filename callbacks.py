@@ -8,13 +8,56 @@ BEAT visualization tool - Callback functions
 """
 
 import dash
-from dash import Input, Output, State, no_update
+from dash import Input, Output, State, ClientsideFunction, no_update
 from dash import html
+from flask import Response, request
+import pandas as pd
 import os
 import signal
+import file_handler as fh
+import derived
+import beats
 import functions as func
+import comparison as comp
+import export as exp
+import timebase
+import message_search
 
-def register_callbacks(app, df_num, df_text, plot_title):
+# The clientside callbacks (assets/clientside.js) use dash_clientside.set_props, which is available from Dash 2.16
+min_dash_version = (2, 16)
+
+def register_callbacks(app, df_num, df_text, plot_title, events, summary, file_path, sections, df_stored, beat_table, loading, message_index, tb):
+    
+    if tuple(int(part) for part in dash.__version__.split(".")[:2]) < min_dash_version:
+        raise RuntimeError(f"Dash {'.'.join(map(str, min_dash_version))} or newer is required "
+                           f"(installed: {dash.__version__}), see requirements.txt")
+    
+    # Data of the normal and advanced views. The advanced variables are only read when first needed.
+    # Until the background loading is finished, the normal view only has the columns that were loaded first.
+    views = {"normal": df_num}
+    
+    def get_view(mode):
+        nonlocal df_stored
+        
+        # Switch to the complete data when it is loaded (the advanced view waits for it)
+        if (loading.done() or mode != "normal") and df_stored is not loading.result()[0]:
+            df_stored = loading.result()[0]
+            views.clear()
+            views["normal"] = derived.add_signals(file_path, df_stored, derived.group_signals("normal"))
+        
+        if mode not in views:
+            print("Loading the advanced variables...")
+            df_sources = pd.concat([df_stored, fh.read_advanced_data(file_path)], axis=1)
+            views[mode] = derived.add_signals(file_path, df_sources, derived.group_signals("normal") + derived.group_signals("advanced"))
+        return views[mode]
+    
+    # Beat tables of the channels, sorted by time when first needed
+    channel_beats = {}
+    
+    def get_beats(channel):
+        if channel not in channel_beats:
+            channel_beats[channel] = beats.channel_beats(beat_table, channel)
+        return channel_beats[channel]
     
     # Callback for the shutdown button
     @app.callback(
@@ -39,106 +82,240 @@ def register_callbacks(app, df_num, df_text, plot_title):
         </script>
         """
 
-    # Callback to toggle inflation phases
+    # Export of the zoomed window, streamed by the server
+    @app.server.route('/export')
+    def export_page():
+        fmt = request.args.get("format", "csv")
+        x_min = request.args.get("x_min", type=float)
+        x_max = request.args.get("x_max", type=float)
+        section = request.args.get("section", type=int)
+        
+        # The export waits for the background loading, so the columns that are not loaded yet are not left out
+        loading.result()
+        df = get_view("normal")
+        columns = request.args.getlist("col") or list(df.columns)
+        if not all(column in df or column in df_text for column in columns):
+            df = get_view("advanced")
+        try:
+            bounds = timebase.section_bounds(sections, df.index, include=[section]) if section is not None else None
+            stream = exp.export_window(df, df_text, events, columns, x_min, x_max, fmt=fmt, bounds=bounds, tb=tb)
+        except ValueError as e:
+            return Response(str(e), status=400, mimetype="text/plain")
+        
+        mimetype, extension = exp.export_formats[fmt]
+        file_name = os.path.splitext(plot_title.replace("File: ", ""))[0] + extension
+        return Response(stream, mimetype=mimetype, headers={"Content-Disposition": f"attachment; filename=\"{file_name}\""})
+
+    # Clientside callback to toggle the inflation phase and message overlays
+    app.clientside_callback(
+        ClientsideFunction(namespace='beat', function_name='update_overlays'),
+        Output('plot', 'figure'),
+        Input('inflation_button', 'n_clicks'),
+        Input('alarm_button', 'n_clicks'),
+        Input('ui_button', 'n_clicks'),
+        Input('wire_button', 'n_clicks'),
+        State('inf-phases-store', 'data'),
+        State('alarms-store', 'data'),
+        State('ui-store', 'data'),
+        State('wire-store', 'data'),
+        State('plot', 'figure'),
+        prevent_initial_call=True
+    )
+
+    # Callback to switch between the normal and advanced views
     @app.callback(
-    Output('plot', 'figure'),
-    Input('inflation_button', 'n_clicks'),
-    Input('alarm_button', 'n_clicks'),
-    Input('ui_button', 'n_clicks'),
-    Input('wire_button', 'n_clicks'),
-    State('inf-phases-store', 'data'),
-    State('alarms-store', 'data'),
-    State('ui-store', 'data'),
-    State('wire-store', 'data'),
-    prevent_initial_call=True
+        Output('plot', 'figure', allow_duplicate=True),
+        Output('var_selector', 'options'),
+        Input('view_mode', 'value'),
+        Input('gap_mode', 'value'),
+        State('inflation_button', 'n_clicks'),
+        State('alarm_button', 'n_clicks'),
+        State('ui_button', 'n_clicks'),
+        State('wire_button', 'n_clicks'),
+        State('inf-phases-store', 'data'),
+        State('alarms-store', 'data'),
+        State('ui-store', 'data'),
+        State('wire-store', 'data'),
+        prevent_initial_call=True
     )
-    def update_plot(inf_clicks, alarm_clicks, ui_clicks, wire_clicks, phases, alarms, uis, wires):
-            
-        fig = func.display_figure(df_num, plot_title)  # Default figure
+    def update_view(mode, gap_mode, inf_clicks, alarm_clicks, ui_clicks, wire_clicks, phases, alarms, uis, wires):
+        return render_view(mode, gap_mode, inf_clicks, alarm_clicks, ui_clicks, wire_clicks, phases, alarms, uis, wires)
+    
+    # Callback to show the remaining variables when the background loading is finished
+    @app.callback(
+        Output('plot', 'figure', allow_duplicate=True),
+        Output('var_selector', 'options', allow_duplicate=True),
+        Output('export_vars', 'options'),
+        Output('compare_var', 'options'),
+        Output('load-poll', 'disabled'),
+        Input('load-poll', 'n_intervals'),
+        State('view_mode', 'value'),
+        State('gap_mode', 'value'),
+        State('inflation_button', 'n_clicks'),
+        State('alarm_button', 'n_clicks'),
+        State('ui_button', 'n_clicks'),
+        State('wire_button', 'n_clicks'),
+        State('inf-phases-store', 'data'),
+        State('alarms-store', 'data'),
+        State('ui-store', 'data'),
+        State('wire-store', 'data'),
+        prevent_initial_call=True
+    )
+    def finish_loading(n_intervals, mode, gap_mode, inf_clicks, alarm_clicks, ui_clicks, wire_clicks, phases, alarms, uis, wires):
+        
+        if not loading.done():
+            return no_update, no_update, no_update, no_update, False
+        print("All variables are loaded.")
+        
+        fig, options = render_view(mode, gap_mode, inf_clicks, alarm_clicks, ui_clicks, wire_clicks, phases, alarms, uis, wires)
+        columns = list(get_view("normal").columns)
+        return (fig, options, [{'label': column, 'value': column} for column in columns + list(df_text.columns)],
+                [{'label': column, 'value': column} for column in columns], True)
     
-        # Handle inflation button
-        visibility_inf = bool(inf_clicks % 2)    
-        if visibility_inf:
+    def render_view(mode, gap_mode, inf_clicks, alarm_clicks, ui_clicks, wire_clicks, phases, alarms, uis, wires):
+        
+        df = get_view(mode)
+        gaps = timebase.gap_rows(sections, df.index) if gap_mode else None
+        fig = func.display_figure(df, plot_title, gaps, tb)
+        
+        # Keep the overlays that are switched on
+        if inf_clicks % 2:
             for event in phases["inflation"]:
-                func.highlight_area(fig, event['start_time'], event['end_time'], color="darkred", label="inflation", visibility=visibility_inf)
+                func.highlight_area(fig, event['start_time'], event['end_time'], color="darkred", label="inflation")
             for event in phases["deflation"]:
-                func.highlight_area(fig, event['start_time'], event['end_time'], color="darkblue", label="deflation", visibility=visibility_inf)
+                func.highlight_area(fig, event['start_time'], event['end_time'], color="darkblue", label="deflation")
             for event in phases["pause"]:
-                func.highlight_area(fig, event['start_time'], event['end_time'], color="gray", label="pause", visibility=visibility_inf)
-    
-        # Handle Alarm button
-        visibility_alarm = bool(alarm_clicks % 2)
-        if visibility_alarm:
-            for event in alarms:
-                func.show_alarms(fig, event['start'], event['end'], color="yellow", label=event['alarm'], visibility=visibility_alarm)
-            
-        # Handle UI button
-        visibility_ui = bool(ui_clicks % 2)
-        if visibility_ui:
-            for event in uis:
-                func.show_alarms(fig, event['start'], event['end'], color="lightblue", label=event['alarm'], visibility=visibility_ui)
-            
-        # Handle Catheter button
-        visibility_wire = bool(wire_clicks % 2)
-        if visibility_wire:
-            for event in wires:
-                func.show_alarms(fig, event['start'], event['end'], color="deeppink", label=event['alarm'], visibility=visibility_wire)
-            
-        return fig
+                func.highlight_area(fig, event['start_time'], event['end_time'], color="gray", label="pause")
+        for clicks, items, color in ((alarm_clicks, alarms, "yellow"), (ui_clicks, uis, "lightblue"), (wire_clicks, wires, "deeppink")):
+            if clicks % 2:
+                for event in items:
+                    func.show_alarms(fig, event['start'], event['end'], color=color, label=event['alarm'])
+        
+        return fig, [{'label': column, 'value': column} for column in df.columns]
 
-    # Callback to update the zoom range
-    @app.callback(
+    # Clientside callback to update the zoom range (debounced)
+    app.clientside_callback(
+        ClientsideFunction(namespace='beat', function_name='update_zoom_range'),
         Output('zoom-store', 'data'),
         Input('plot', 'relayoutData'),
+        State('zoom-store', 'data'),
         prevent_initial_call=True
     )
-    def update_zoom_range(relayout_data):
-        if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
-            return {
-                'x_min': relayout_data['xaxis.range[0]'],
-                'x_max': relayout_data['xaxis.range[1]']
-            }
-        return None
 
-    @app.callback(
+    # Clientside callback to show the variable selector
+    app.clientside_callback(
+        ClientsideFunction(namespace='beat', function_name='toggle_var_selector'),
         Output('var_selector', 'style'),
-        [Input('stat_selector', 'value')],
-         [State('var_selector', 'style')]
+        Input('stat_selector', 'value'),
+        State('var_selector', 'style')
     )
-    def select_stat(selected_stat, current_style):
-        
-        updated_style = current_style.copy()
-        
-        # Display variable selector
-        if selected_stat == 'measure':
-            updated_style['display'] = 'block'
-            return updated_style
-        else:
-            updated_style['display'] = 'none'
-            return updated_style
-        
+    
     @app.callback(
         Output('stat_display', 'children'),
         [Input('stat_selector', 'value'),
          Input('zoom-store', 'data'),
-         Input('var_selector', 'value')]
+         Input('var_selector', 'value')],
+        State('view_mode', 'value')
     )
-    def select_var(selected_stat, zoom_range, selected_var):
+    def select_var(selected_stat, zoom_range, selected_var, mode):
         
         # Display inflation / diflation statistics
         if selected_stat == 'inflation':
-            stat = func.measure_inflation(df_num)
+            stat = func.measure_inflation(summary["phases"])
             return html.P(stat)
         
         # Display pressure statistics
         elif selected_stat == 'measure' and selected_var:
-            stat = func.extract_data(df_num, zoom_range, selected_var)
+            stat = func.extract_data(get_view(mode), zoom_range, selected_var, summary, tb)
             return stat
         
+        # Display pressure statistics per inflation phase
+        elif selected_stat == 'phases' and selected_var:
+            return func.display_phase_stats(summary, selected_var)
+        
+        # Display beat statistics of a fast pressure channel in the zoomed range
+        elif selected_stat == 'beats' and selected_var:
+            if selected_var not in beats.beat_channels:
+                return html.P("Beat statistics are available for: " + ", ".join(beats.beat_channels))
+            return func.display_beat_stats(get_beats(selected_var), zoom_range, selected_var)
+        
+        # Display statistics of every variable
+        elif selected_stat == 'summary':
+            return func.display_summary(summary)
+        
+        # Display the section table
+        elif selected_stat == 'sections':
+            return func.display_sections(sections)
+        
         # Default
         else:
             return html.Div([
                 html.P("Select a variable to display relevant statistics.")
             ])
-     
+
+    # Clientside callback to update the export link with the zoom range and the selected variables
+    app.clientside_callback(
+        ClientsideFunction(namespace='beat', function_name='update_export_link'),
+        Output('export_link', 'href'),
+        Input('zoom-store', 'data'),
+        Input('export_vars', 'value'),
+        Input('export_format', 'value')
+    )
+
+    # Callback for the message search (the index is searched, the messages are not scanned)
+    @app.callback(
+        Output('search_hits', 'options'),
+        Output('search_info', 'children'),
+        Output('search-page', 'data'),
+        Input('search_query', 'value'),
+        Input('search_regex', 'value'),
+        Input('search_channels', 'value'),
+        Input('search_prev', 'n_clicks'),
+        Input('search_next', 'n_clicks'),
+        State('search-page', 'data'),
+        prevent_initial_call=True
+    )
+    def search_messages(query, regex, channels, prev_clicks, next_clicks, page):
+        
+        # Paging keeps the query, a new query starts from the first page
+        if dash.ctx.triggered_id == 'search_prev':
+            page = max(page - 1, 0)
+        elif dash.ctx.triggered_id == 'search_next':
+            page = page + 1
+        else:
+            page = 0
+        
+        try:
+            hits, total, page = message_search.search(message_index, query, regex=bool(regex), channels=channels, page=page)
+        except ValueError as e:
+            return [], str(e), 0
+        
+        pages = max((total - 1) // message_search.page_size + 1, 1)
+        
+        options = [{'label': f" [{message_search.format_ms(hit['start_ms'])} - {message_search.format_ms(hit['end_ms'])}] "
+                             f"{hit['channel']}: {hit['message']}",
+                    'value': f"{hit['start_ms']},{hit['end_ms']}"} for hit in hits]
+        return options, f"{total} hits, page {page + 1} / {pages}" if query else "", page
+    
+    # Clientside callback to move the plot to the selected hit
+    app.clientside_callback(
+        ClientsideFunction(namespace='beat', function_name='jump_to_hit'),
+        Output('plot', 'figure', allow_duplicate=True),
+        Output('zoom-store', 'data', allow_duplicate=True),
+        Input('search_hits', 'value'),
+        State('plot', 'figure'),
+        prevent_initial_call=True
+    )
+
+    # Callback for the comparison of multiple recordings
+    @app.callback(
+        Output('compare_plot', 'figure'),
+        Input('compare_files', 'value'),
+        Input('compare_var', 'value'),
+        Input('compare_align', 'value')
+    )
+    def update_comparison(file_paths, column, event):
         
+        if not file_paths or not column:
+            return no_update
+        return comp.display_comparison(file_paths, column, event)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:27:01 2026
+
+@author: agent
+
+BEAT visualization tool - Comparison of multiple recordings
+"""
+
+import os
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import file_handler as fh
+import derived
+import functions as func
+import timebase
+import bytecache
+
+max_points = 200000    # Total number of points shown in the comparison plot, shared by all traces
+cache_budget = 512 * 1024**2    # Bytes of loaded columns kept in memory (least recently used are evicted)
+
+# Events the recordings can be aligned on: (label, detector)
+align_events = {
+    "none": ("No alignment", None),
+    "inflation": ("First inflation start", lambda df, tb: func.measure_time(df, 50, 80, tb)),
+    "deflation": ("First deflation start", lambda df, tb: func.measure_time(df, 100, 30, tb)),
+    "pause": ("First pause start", lambda df, tb: func.measure_duration(df, 120, tb)),
+}
+
+def find_cached_recordings(directory):
+    '''
+    List the preprocessed files of a directory.
+    '''
+    names = {name.replace("_BLOCKS", "_PREPROC.gz") for name in os.listdir(directory) if name.endswith(("_PREPROC.gz", "_BLOCKS"))}
+    return sorted(os.path.join(directory, name) for name in names)
+
+def recording_name(file_path):
+    return os.path.basename(file_path).replace("_PREPROC.gz", "")
+
+_cache = bytecache.ByteCache(cache_budget)    # (file path, column, modification time) -> values
+_recordings = {}    # file path -> (modification time, sample index, time base), shared by the columns
+
+def load_column(file_path, column):
+    '''
+    Read a single column of a preprocessed file (the other columns are not parsed).
+    Returns the sample index and the time base of the recording and the values of the column.
+    The values are cached until the preprocessed file changes, the index and the time base are kept once per recording.
+    '''
+    mtime = fh.cache_mtime(file_path)
+    key = (file_path, column, mtime)
+    values = _cache.get(key)
+    if values is None or _recordings.get(file_path, (None,))[0] != mtime:
+        
+        # Derived signals are computed from their dependencies (they are only kept in this cache)
+        if column in derived.derived_signals:
+            df = fh.read_columns(file_path, derived.derived_signals[column]["depends"])
+            values = derived.get_signal(None, df, column).to_numpy()
+        else:
+            df = fh.read_columns(file_path, [column])
+            values = df[column].to_numpy()
+        _cache.put(key, values)
+        
+        if _recordings.get(file_path, (None,))[0] != mtime:
+            index = timebase.compact_index(df.index)
+            _recordings[file_path] = (mtime, index, timebase.TimeBase.from_index(index, fh.fs_index))
+    
+    _, index, tb = _recordings[file_path]
+    return index, tb, values
+
+def align_offset(file_path, event):
+    '''
+    Start time of the first occurrence of the alignment event (0 if not found).
+    '''
+    return _align_offset(file_path, event, fh.cache_mtime(file_path))
+
+@lru_cache(maxsize=256)
+def _align_offset(file_path, event, mtime):
+    detector = align_events[event][1]
+    if detector is None:
+        return 0.0
+    index, tb, state = load_column(file_path, "State")
+    events = detector(pd.DataFrame({"State": state}, index=index), tb)
+    return events[0]['start_time'] if events else 0.0
+
+def decimate(x, y, n_points):
+    '''
+    Min-max decimation: keep the minimum and maximum of every bucket, so peaks survive the downsampling.
+    '''
+    n_buckets = n_points // 2
+    if len(y) <= n_points or n_buckets < 1:
+        return x, y
+
+    # Cut the signal into equally sized buckets (the tail that does not fill a bucket is dropped)
+    bucket = len(y) // n_buckets
+    y_buckets = y[:bucket * n_buckets].reshape(n_buckets, bucket)
+    offsets = np.arange(n_buckets) * bucket
+    i_min = offsets + y_buckets.argmin(axis=1)
+    i_max = offsets + y_buckets.argmax(axis=1)
+
+    # Keep the chronological order of the two points within each bucket
+    idx = np.sort(np.stack([i_min, i_max], axis=1), axis=1).ravel()
+    return x[idx], y[idx]
+
+def display_comparison(file_paths, column, event="none"):
+
+    fig = go.Figure()
+    n_points = max_points // max(len(file_paths), 1)
+
+    for file_path in file_paths:
+        try:
+            _, tb, values = load_column(file_path, column)
+        except KeyError:
+            print(f"{column} is not found in {file_path}")
+            continue
+        offset = align_offset(file_path, event)
+        
+        # Time is only generated for the decimated points
+        idx = decimate(np.arange(len(values)), values, n_points)[0]
+        x, y = tb.time(idx) - offset, values[idx]
+        fig.add_trace(go.Scattergl(x=func.typed_array(x, precision="f8"), y=func.typed_array(y), name=recording_name(file_path), mode="lines"))
+
+    fig.update_layout(
+        height=600,
+        title=f"Comparison: {column}",
+        xaxis_title="Time (s)" if event == "none" else f"Time relative to {align_events[event][0].lower()} (s)",
+        yaxis_title=column,
+        legend_title="Recordings",
+        uirevision='comparison',
+        hovermode="x unified",
+        paper_bgcolor=func.bg_colour,
+    )
+
+    return fig
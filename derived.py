@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:38:54 2026
+
+@author: agent
+
+BEAT - Derived signals
+
+Computed channels (MAP, Pulse BPM, button and pump wheel bits, ...) are defined here as
+vectorized expressions over the stored columns. They are evaluated on first use and kept
+in a per-recording cache, so adding a new channel does not require reprocessing the files.
+"""
+
+import os
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import file_handler as fh
+import blockstore
+import bytecache
+
+cache_budget = 512 * 1024**2    # Bytes of computed signals kept in memory (least recently used are evicted)
+
+# Registry of the derived signals: name -> definition
+derived_signals = OrderedDict()
+
+# Stored columns that are only used as input of derived signals (not displayed)
+source_columns = ['Buttons', 'PumpWheel', 'BVDebug', 'BPDiff', 'BPUpdate']
+
+def register(name, depends, group="normal", as_int=True):
+    '''
+    Decorator to add a derived signal. The function gets a DataFrame with the dependencies and returns the values.
+    group: view the signal belongs to ("normal", "advanced" or None if only computed on request).
+    '''
+    def decorator(function):
+        derived_signals[name] = {"depends": depends, "group": group, "as_int": as_int, "compute": function}
+        return function
+    return decorator
+
+#------------------------------------------------------------------------------------
+# Definitions
+
+@register("MAP", ["Systolic", "Diastolic"])
+def mean_arterial_pressure(df):
+    return (df["Systolic"] + 2 * df["Diastolic"]) / 3.0
+
+@register("Pulse BPM", ["BPDiff", "BPUpdate"])
+def pulse(df):
+    return fh.pulse_bpm(df)
+
+@register("Inflate", ["Buttons"])
+def inflate_button(df):
+    return (df["Buttons"] & 0x03) * 100
+
+@register("Deflate", ["Buttons"])
+def deflate_button(df):
+    return np.right_shift(df["Buttons"] & 0x0C, 2) * 100
+
+@register("Alarm Ack", ["Buttons"])
+def alarm_ack_button(df):
+    return np.right_shift(df["Buttons"] & 0x30, 4) * 100
+
+@register("PW HallA", ["PumpWheel"])
+def pw_hall_a(df):
+    return (np.right_shift(df["PumpWheel"], 2) & 0x01) * 10 - 32
+
+@register("PW HallB", ["PumpWheel"])
+def pw_hall_b(df):
+    return (np.right_shift(df["PumpWheel"], 3) & 0x01) * 10 - 33
+
+@register("BVPoints", ["BVDebug"], group="advanced")
+def bv_points(df):
+    return np.right_shift(df["BVDebug"], 24) * 10
+
+@register("BVState", ["BVDebug"], group="advanced")
+def bv_state(df):
+    return (np.right_shift(df["BVDebug"], 16) & 0x0F) * 10
+
+@register("BVFlags", ["BVDebug"], group="advanced")
+def bv_flags(df):
+    return (df["BVDebug"] & 0x0F) * 10 - 150
+
+@register("PW pos", ["PumpWheel"], group="advanced")
+def pw_position(df):
+    return fh.s16(np.right_shift(df["PumpWheel"], 16)) / 1000
+
+@register("PW State", ["PumpWheel"], group="advanced")
+def pw_state(df):
+    return (np.right_shift(df["PumpWheel"], 4) & 0x0F) * 10
+
+@register("PW Illegal", ["PumpWheel"], group="advanced")
+def pw_illegal(df):
+    return (np.right_shift(df["PumpWheel"], 8) & 0x00FF) * 10
+
+@register("GPIO HallA", ["PumpWheel"], group="advanced")
+def gpio_hall_a(df):
+    return (df["PumpWheel"] & 0x01) * 10 - 20
+
+@register("GPIO HallB", ["PumpWheel"], group="advanced")
+def gpio_hall_b(df):
+    return (np.right_shift(df["PumpWheel"], 1) & 0x01) * 10 - 21
+
+#------------------------------------------------------------------------------------
+# Evaluation and cache
+
+_cache = bytecache.ByteCache(cache_budget)    # (recording, name) -> Series
+
+def group_signals(group):
+    return [name for name, definition in derived_signals.items() if definition["group"] == group]
+
+def required_columns(names):
+    '''
+    Stored columns needed to display the given variables (derived signals are replaced by their dependencies).
+    '''
+    columns = []
+    for name in names:
+        for column in derived_signals[name]["depends"] if name in derived_signals else [name]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+def available_signals(df, names):
+    '''
+    Derived signals that can be computed from the columns of df.
+    '''
+    return [name for name in names if all(column in df for column in derived_signals[name]["depends"])]
+
+def clear_cache(recording=None):
+    _cache.clear(lambda key: recording is None or key[0] == recording)
+
+def derived_path(preproc_path):
+    return preproc_path.replace("_PREPROC.gz", "_DERIVED.gz")
+
+def read_stored_signal(recording, name, index):
+    '''
+    Derived signal stored in the cache of the recording (None if it is not stored or it does not match the index).
+    '''
+    directory = fh.blocks_path(recording)
+    if blockstore.exists(directory):
+        manifest = blockstore.read_manifest(directory)
+        if name not in manifest.get("derived", {}) or manifest["rows"] != len(index):
+            return None
+        return pd.Series(blockstore.read_columns(directory, [name], manifest, group="derived")[name], index=index, name=name)
+
+    file_path = derived_path(recording)
+    if not os.path.exists(file_path):
+        return None
+    columns = pd.read_csv(file_path, nrows=0, delimiter=";").columns
+    if name not in columns:
+        return None
+    series = pd.read_csv(file_path, index_col=0, usecols=[columns[0], name], compression='infer', delimiter=";")[name]
+    if not series.index.equals(index):
+        print(f"The stored {name} does not match the preprocessed file, it is computed again.")
+        return None
+    return series
+
+def store_signal(recording, name, series):
+    '''
+    Save a derived signal into the cache of the recording: into the block store, or into _DERIVED.gz next to the
+    gzip preprocessed file. The stored signals are removed when the recording is preprocessed again.
+    '''
+    directory = fh.blocks_path(recording)
+    if blockstore.exists(directory):
+        blockstore.write_column(directory, name, series.to_numpy())
+        print(f"{name} is stored in {directory}")
+        return
+
+    file_path = derived_path(recording)
+    df = pd.read_csv(file_path, index_col=0, compression='infer', delimiter=";") if os.path.exists(file_path) \
+        else pd.DataFrame(index=series.index)
+    df[name] = series
+    df.to_csv(file_path, index=True, header=True, sep=";", encoding="utf-8", compression="gzip")
+    print(f"{name} is stored in {file_path}")
+
+def get_signal(recording, df, name, store=False):
+    '''
+    Values of a derived signal of a recording. Computed from the columns of df on first use, then served from the cache.
+    recording: key of the recording (path of the preprocessed file), store: also save it into the file cache.
+    Without a recording (e.g. while preprocessing) the values are computed every time and not cached.
+    '''
+    key = (recording, name)
+    if recording is not None and key in _cache:
+        return _cache.get(key)
+
+    series = read_stored_signal(recording, name, df.index) if recording else None
+    if series is None:
+        definition = derived_signals[name]
+        missing = [column for column in definition["depends"] if column not in df]
+        if missing:
+            raise KeyError(f"{name} depends on missing columns: {missing}")
+        values = definition["compute"](df[definition["depends"]])
+        series = pd.Series(values, index=df.index, name=name)
+        if definition["as_int"]:
+            series = series.astype(int)
+        if store and recording:
+            store_signal(recording, name, series)
+
+    if recording is not None:
+        _cache.put(key, series)
+    return series
+
+def add_signals(recording, df, names):
+    '''
+    DataFrame of the stored columns (without the source-only columns) and the requested derived signals.
+    '''
+    signals = {name: get_signal(recording, df, name) for name in names}
+    return pd.concat([df.drop(columns=[column for column in source_columns if column in df]), pd.DataFrame(signals)], axis=1)
+
+if __name__ == "__main__":
+    
+    # Store derived signals into the cache of a preprocessed file, e.g.: python derived.py rec_PREPROC.gz "MAP"
+    import sys
+    preproc_path, names = sys.argv[1], sys.argv[2:]
+    df_stored, _ = fh.read_preproc_data(preproc_path)
+    for name in names:
+        get_signal(preproc_path, pd.concat([df_stored, fh.read_advanced_data(preproc_path)], axis=1), name, store=True)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:26:26 2026
+
+@author: agent
+
+BEAT - Cross-recording event index
+
+Collects the inflation/deflation/pause phases and the Alarm/UI/Wire messages of many
+recordings into one SQLite file, so fleet-wide questions can be answered without
+reopening any recording.
+"""
+
+import os
+import sqlite3
+import argparse
+import file_handler as fh
+import functions as func
+import summary
+
+default_db_name = "BEAT_events.sqlite"
+text_channels = ["Alarm", "UI", "Wire"]
+
+schema = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id              INTEGER PRIMARY KEY,
+    path            TEXT UNIQUE NOT NULL,
+    name            TEXT,
+    mtime           REAL,
+    catheter_id     TEXT,
+    hw_revision     TEXT,
+    device_sw       TEXT,
+    beat_sw         TEXT,
+    duration        REAL
+);
+CREATE TABLE IF NOT EXISTS metadata (
+    recording_id    INTEGER REFERENCES recordings(id) ON DELETE CASCADE,
+    key             TEXT,
+    value           TEXT
+);
+CREATE TABLE IF NOT EXISTS phases (
+    recording_id    INTEGER REFERENCES recordings(id) ON DELETE CASCADE,
+    phase           TEXT,
+    start_time      REAL,
+    end_time        REAL,
+    duration        REAL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    recording_id    INTEGER REFERENCES recordings(id) ON DELETE CASCADE,
+    channel         TEXT,
+    message         TEXT,
+    start_time      REAL,
+    end_time        REAL
+);
+CREATE INDEX IF NOT EXISTS idx_phases ON phases (phase, duration);
+CREATE INDEX IF NOT EXISTS idx_messages ON messages (channel, message);
+CREATE INDEX IF NOT EXISTS idx_metadata ON metadata (key, value);
+CREATE INDEX IF NOT EXISTS idx_catheter ON recordings (catheter_id);
+"""
+
+def connect(db_path):
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(schema)
+    return conn
+
+def find_recordings(directory):
+    '''
+    Collect the raw data files of a directory (recursively). Cache files are skipped.
+    '''
+    recordings = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(".txt"):
+                recordings.append(os.path.join(root, name))
+    return recordings
+
+def extract_events(stats, df_text):
+    '''
+    Collect the phase and message tables of one recording.
+    '''
+    phases = []
+    for phase, events in summary.phase_events(stats).items():
+        for event in events:
+            phases.append((phase, event['start_time'], event['end_time'], event['duration']))
+
+    messages = []
+    for channel in text_channels:
+        for event in func.measure_text_duration(df_text, column=channel):
+            messages.append((channel, event['alarm'].strip(), event['start'], event['end']))
+
+    return phases, messages
+
+def ingest_recording(conn, file_path, force=False):
+    '''
+    Add (or refresh) one recording in the index. Recordings that are unchanged and were indexed by the same
+    BEAT SW version are skipped. Returns True if the recording was (re)indexed.
+    '''
+    file_path = os.path.abspath(file_path)
+    mtime = os.path.getmtime(file_path)
+
+    row = conn.execute("SELECT id, mtime, beat_sw FROM recordings WHERE path = ?", (file_path,)).fetchone()
+    if row and row["mtime"] == mtime and row["beat_sw"] == fh.sw_version and not force:
+        return False
+
+    # Load the recording through the cache (preprocess if needed)
+    preproc_path = fh.get_preproc_file(file_path)
+    df_num, df_text = fh.read_preproc_data(preproc_path)
+    stats = summary.load_summary(preproc_path, df_num, fh.fs_index)
+    phases, messages = extract_events(stats, df_text)
+
+    base_name, _ = os.path.splitext(file_path)
+    metadata = fh.read_metadata(f"{base_name}_metadata.csv")
+
+    with conn:
+        if row:
+            conn.execute("DELETE FROM recordings WHERE id = ?", (row["id"],))
+        cursor = conn.execute(
+            "INSERT INTO recordings (path, name, mtime, catheter_id, hw_revision, device_sw, beat_sw, duration) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (file_path, os.path.basename(file_path), mtime,
+             metadata.get("Catheter ID"), metadata.get("HW revision"),
+             metadata.get("SW version"), metadata.get("BEAT SW version"), stats["duration"]))
+        recording_id = cursor.lastrowid
+        conn.executemany("INSERT INTO metadata VALUES (?, ?, ?)",
+                         [(recording_id, key, value) for key, value in metadata.items()])
+        conn.executemany("INSERT INTO phases VALUES (?, ?, ?, ?, ?)",
+                         [(recording_id, *phase) for phase in phases])
+        conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?)",
+                         [(recording_id, *message) for message in messages])
+
+    print(f"Indexed {os.path.basename(file_path)}: {len(phases)} phases, {len(messages)} messages")
+    return True
+
+def build_index(directory, db_path=None, force=False):
+    '''
+    Ingest every recording of a directory into the index file.
+    '''
+    if not db_path: db_path = os.path.join(directory, default_db_name)
+    conn = connect(db_path)
+
+    indexed = 0
+    for file_path in find_recordings(directory):
+        try:
+            indexed += ingest_recording(conn, file_path, force=force)
+        except Exception as e:
+            print(f"ERROR: {file_path} could not be indexed: {e}")
+
+    print(f"{indexed} recording(s) indexed into {db_path}")
+    return conn
+
+#------------------------------------------------------------------------------------
+# Queries
+
+def query_phases(conn, phase, min_duration=None, max_duration=None):
+    '''
+    Phases of a given kind, e.g. every "inflation" longer than 300 s.
+    '''
+    sql = ("SELECT r.name, r.path, r.catheter_id, p.phase, p.start_time, p.end_time, p.duration "
+           "FROM phases p JOIN recordings r ON r.id = p.recording_id WHERE p.phase = ?")
+    args = [phase]
+    if min_duration is not None:
+        sql += " AND p.duration >= ?"
+        args.append(min_duration)
+    if max_duration is not None:
+        sql += " AND p.duration <= ?"
+        args.append(max_duration)
+    return [dict(row) for row in conn.execute(sql + " ORDER BY r.name, p.start_time", args)]
+
+def query_messages(conn, text, channel=None, exact=False):
+    '''
+    Every occurrence of a message (e.g. an alarm), optionally limited to one channel.
+    '''
+    sql = ("SELECT r.name, r.path, r.catheter_id, m.channel, m.message, m.start_time, m.end_time "
+           "FROM messages m JOIN recordings r ON r.id = m.recording_id ")
+    if exact:
+        sql += "WHERE m.message = ?"
+        args = [text]
+    else:
+        # The wildcards of LIKE in the text are matched literally
+        escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        sql += "WHERE m.message LIKE ? ESCAPE '\\'"
+        args = [f"%{escaped}%"]
+    if channel:
+        sql += " AND m.channel = ?"
+        args.append(channel)
+    return [dict(row) for row in conn.execute(sql + " ORDER BY r.name, m.start_time", args)]
+
+def query_recordings(conn, catheter_id=None, **metadata):
+    '''
+    Recordings matching a catheter ID and/or metadata values (e.g. hw_revision="600100-00-2").
+    '''
+    sql = "SELECT * FROM recordings WHERE 1 = 1"
+    args = []
+    if catheter_id:
+        sql += " AND catheter_id = ?"
+        args.append(catheter_id)
+    for key, value in metadata.items():
+        
+        # Indexed recording columns
+        if key in ("hw_revision", "device_sw", "beat_sw"):
+            sql += f" AND {key} = ?"
+            args.append(value)
+            
+        # Any other line of the metadata file
+        else:
+            sql += " AND id IN (SELECT recording_id FROM metadata WHERE key = ? AND value = ?)"
+            args += [key, value]
+    return [dict(row) for row in conn.execute(sql + " ORDER BY name", args)]
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="BEAT cross-recording event index")
+    parser.add_argument("directory", help="Directory of the raw data files")
+    parser.add_argument("--db", help="Index file (default: <directory>/" + default_db_name + ")")
+    parser.add_argument("--force", action="store_true", help="Re-index unchanged recordings")
+    parser.add_argument("--phase", help="Query phases, e.g. inflation")
+    parser.add_argument("--min-duration", type=float)
+    parser.add_argument("--message", help="Query messages containing this text")
+    parser.add_argument("--channel", choices=text_channels)
+    args = parser.parse_args()
+
+    conn = build_index(args.directory, args.db, force=args.force)
+    if args.phase:
+        for row in query_phases(conn, args.phase, min_duration=args.min_duration):
+            print(f"{row['name']}: [{round(row['start_time'])} - {round(row['end_time'])}] s, Duration = {round(row['duration'])} s")
+    if args.message:
+        for row in query_messages(conn, args.message, channel=args.channel):
+            print(f"{row['name']}: {row['channel']} '{row['message']}' [{round(row['start_time'])} - {round(row['end_time'])}] s")
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:27:59 2026
+
+@author: agent
+
+BEAT visualization tool - Export of a time window
+
+The rows of the window are computed from the time base (no boolean mask over the full
+recording) and streamed chunk by chunk, so the export cost is proportional to the
+window size.
+"""
+
+import io
+import csv
+import json
+import importlib.util
+import zipfile
+import numpy as np
+import file_handler as fh
+import timebase
+
+chunksize = 10000   # Rows per streamed chunk
+export_formats = {
+    "csv": ("text/csv", ".csv"),
+    "npz": ("application/zip", ".npz"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+class StreamBuffer(io.RawIOBase):
+    '''
+    Write-only, non-seekable file object. The written bytes are collected until drained by the response generator.
+    '''
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def window_events(events, x_min=None, x_max=None):
+    '''
+    Event segments overlapping with the window. Events are dicts of type, label, start, end.
+    '''
+    return [event for event in events
+            if (x_max is None or event['start'] <= x_max) and (x_min is None or event['end'] >= x_min)]
+
+def collect_events(phases, text_events):
+    '''
+    Flatten the phase and message tables (as kept in the stores) into one event list.
+    '''
+    events = []
+    for phase, items in phases.items():
+        for item in items or []:
+            events.append({"type": phase, "label": phase, "start": item['start_time'], "end": item['end_time']})
+    for channel, items in text_events.items():
+        for item in items:
+            events.append({"type": channel, "label": item['alarm'].strip(), "start": item['start'], "end": item['end']})
+    return sorted(events, key=lambda event: event['start'])
+
+def column_views(df_num, df_text, columns, tb, rows):
+    '''
+    Window of each column as a NumPy view (numeric) or a small sliced array (text); the frames are not copied.
+    The time column is generated for the window only.
+    '''
+    views = {"Time": tb.times(rows)}
+    for column in columns:
+        if column in df_num:
+            views[column] = df_num[column].to_numpy()[rows]
+        elif column in df_text:
+            views[column] = df_text[column].to_numpy()[rows]
+    return views
+
+def stream_csv(views, events):
+
+    # Fields with the separator or quotes (e.g. in the messages) are quoted by the csv writer
+    text = io.StringIO()
+    writer = csv.writer(text, delimiter=";", lineterminator="\n")
+
+    # Events are written as comment lines ahead of the data
+    writer.writerows(["# Event", event['type'], event['label'], event['start'], event['end']] for event in events)
+    writer.writerow(views)
+    yield text.getvalue()
+
+    arrays = list(views.values())
+    n_rows = len(arrays[0])
+    for start in range(0, n_rows, chunksize):
+        text.seek(0)
+        text.truncate()
+        columns = [["" if value is None or value != value else value for value in array[start:start + chunksize].tolist()]
+                   for array in arrays]
+        writer.writerows(zip(*columns))
+        yield text.getvalue()
+
+def stream_npz(views, events):
+
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, array in views.items():
+            if array.dtype == object:
+                # Missing messages are empty strings (astype would write them as 'nan')
+                array = np.array(["" if value is None or value != value else value for value in array.tolist()], dtype=str)
+            with archive.open(f"{name}.npy", mode="w", force_zip64=True) as file:
+                np.lib.format.write_array(file, array, allow_pickle=False)
+            yield buffer.drain()
+        with archive.open("events.npy", mode="w") as file:
+            np.lib.format.write_array(file, np.array([json.dumps(event) for event in events], dtype=str))
+    yield buffer.drain()
+
+def stream_parquet(views, events):
+
+    # Parquet export is optional, it is only available if pyarrow is installed
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.string() if array.dtype == object else pa.from_numpy_dtype(array.dtype))
+                        for name, array in views.items()],
+                       metadata={"events": json.dumps(events)})
+    buffer = StreamBuffer()
+    n_rows = len(next(iter(views.values())))
+    with pq.ParquetWriter(buffer, schema) as writer:
+        for start in range(0, n_rows, chunksize * 10):
+            batch = [pa.array(array[start:start + chunksize * 10], type=field.type, from_pandas=True)
+                     for array, field in zip(views.values(), schema)]
+            writer.write_table(pa.Table.from_arrays(batch, schema=schema))
+            yield buffer.drain()
+    yield buffer.drain()
+
+def export_window(df_num, df_text, events, columns, x_min=None, x_max=None, fmt="csv", bounds=None, tb=None):
+    '''
+    Returns a generator streaming the selected columns and events of the time window in the given format.
+    The window can be limited to a row range, e.g. of a section (bounds = [(start, end)]).
+    tb: time base of the recording (built from the index if not given).
+    '''
+    if fmt not in export_formats:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ValueError("Parquet export requires the pyarrow package.")
+    
+    if tb is None:
+        tb = timebase.TimeBase.from_index(df_num.index, fh.fs_index)
+    rows = tb.slice(x_min, x_max)
+    if bounds is not None:
+        start, end = bounds[0] if bounds else (0, 0)
+        rows = slice(max(rows.start, start), max(min(rows.stop, end), max(rows.start, start)))
+    views = column_views(df_num, df_text, columns, tb, rows)
+    if rows.stop > rows.start:
+        events = window_events(events, float(tb.time(rows.start)), float(tb.time(rows.stop - 1)))
+    else:
+        events = []
+
+    if fmt == "csv":
+        return stream_csv(views, events)
+    elif fmt == "npz":
+        return stream_npz(views, events)
+    else:
+        return stream_parquet(views, events)
@@ -14,12 +14,29 @@ import os
 import re
 import csv
 import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
+import summary
+import timebase
+import derived
+import beats
+import blockstore
+import memprofile
+import message_search
 
 prev_battery = 100  # Battery charge %
 fs = 200    # 200 Hz sampling frequency
 fs_index = 50   # 50 Hz sampling freq per index (as every 4th sample is recorded only)
-sw_version = "2025_01_17__1"
+sw_version = "2026_10_19__6"
 bsn, tsn = None, None     #Balloon and Tip sensitivity values
+cache_format = "blocks"   # "blocks": block-compressed column store, "gzip": _PREPROC.gz and _ADVANCED.gz CSV files
+
+# Non-numerical variables (messages)
+text_columns = ["Comment", "Alarm", "UI", "Wire"]
+
+# Variables of the advanced view. They are stored in a separate file of the cache,
+# so the normal view can be loaded without reading them.
+advanced_columns = ['SlowBPDiff', 'BPStable', 'BalloonHigh', 'BalloonLow', 'BalloonDiff', 'AirTemp', 'AirPres',
+                    'SubjTemp', 'VrefintFast', 'VrefintSlow', 'TgtSpeed', 'CurSpeed', 'BVDebug']
 
 def export_metadata(metadata, filename):
     try:
@@ -123,6 +140,10 @@ def read_raw_data(file_path):
                     row += [wire if wire else ""]
                     alarm = ui = wire = ""
                     datalines.append(row)  
+                    
+                    # The list of rows grows fast, stop early if the memory budget is exceeded
+                    if len(datalines) % 100000 == 0:
+                        memprofile.check_budget("read_raw_data")
         
         # Close the last section
         if datalines:
@@ -133,17 +154,109 @@ def read_raw_data(file_path):
     print("Data read successfully")
     return sections, metadata
 
+def misordered_rows(original_index, section_id, raw_rows):
+    '''
+    Rows with a corrupted Index: the Index breaks the order of the section, while the rows before and after it follow
+    each other. raw_rows: rows in the raw file (rows dropped in between are taken into account).
+    '''
+    follows = (np.diff(original_index) == np.diff(raw_rows)) & (np.diff(section_id) == 0)
+    skip = np.zeros(len(original_index), dtype=bool)
+    if len(original_index) > 2:
+        around = (original_index[2:] - original_index[:-2] == raw_rows[2:] - raw_rows[:-2]) & (section_id[2:] == section_id[:-2])
+        skip[1:-1] = ~follows[:-1] & ~follows[1:] & around
+    return skip
+
+def build_section_table(original_index, section_id, raw_rows):
+    '''
+    Table of the continuous parts of the recording: start row and first sample (in the preprocessed file), number of
+    samples, original first Index and whether there is a gap before it (device restart or missing Index values).
+    Built from the rows kept by convert_data. original_index, section_id: Index and section of the rows,
+    raw_rows: rows in the raw file, so the rows dropped as corrupted do not split the parts.
+    '''
+    # A new part starts with every new section (header line) and wherever the Index does not follow the raw rows
+    steps = np.diff(original_index) != np.diff(raw_rows)
+    breaks = np.flatnonzero(steps | (np.diff(section_id) != 0)) + 1
+    starts = np.concatenate(([0], breaks)) if len(original_index) else np.array([], dtype=np.int64)
+    ends = np.append(starts[1:], len(original_index))
+    gaps = np.concatenate(([False], steps[starts[1:] - 1])) if len(starts) else []
+    first_index, last_index = original_index[starts], original_index[ends - 1]
+    
+    # The sample index follows the Index within a section, so missing Index values leave a hole in the time axis.
+    # After a device restart the Index starts again, the new section continues after the last sample.
+    start_samples = np.zeros(len(starts), dtype=np.int64)
+    for k in range(1, len(starts)):
+        last_sample = start_samples[k - 1] + last_index[k - 1] - first_index[k - 1]
+        skipped = first_index[k] - last_index[k - 1]
+        same_section = section_id[starts[k]] == section_id[starts[k] - 1]
+        start_samples[k] = last_sample + (skipped if same_section and skipped > 0 else 1)
+    
+    print("Number of gaps detected: ", int(np.sum(gaps)))
+    return pd.DataFrame({
+        "section": section_id[starts],
+        "start_row": starts,
+        "start_sample": start_samples,
+        "rows": last_index - first_index + 1,
+        "first_index": first_index,
+        "gap": gaps
+    })
+
+def sample_index(section_table, original_index):
+    '''
+    Sample index of the rows of the preprocessed file (see build_section_table).
+    '''
+    counts = np.diff(np.append(section_table["start_row"].to_numpy(), len(original_index)))
+    shift = np.repeat((section_table["start_sample"] - section_table["first_index"]).to_numpy(), counts)
+    return pd.Index(original_index + shift, name="Sample")
+
+def sections_path(preproc_path):
+    return preproc_path.replace("_PREPROC.gz", "_sections.csv")
+
+def read_sections(file_path):
+    '''
+    Read the section table of a preprocessed file.
+    '''
+    return pd.read_csv(sections_path(file_path), sep=";")
+
+def blocks_path(preproc_path):
+    return preproc_path.replace("_PREPROC.gz", "_BLOCKS")
+
+def cache_exists(preproc_path):
+    '''
+    The preprocessed data is available either in a block store or in the gzip CSV file.
+    '''
+    return blockstore.exists(blocks_path(preproc_path)) or os.path.exists(preproc_path)
+
+def cache_mtime(preproc_path):
+    '''
+    Modification time of the preprocessed data (the manifest of the block store is written last).
+    '''
+    if blockstore.exists(blocks_path(preproc_path)):
+        return os.path.getmtime(blockstore.manifest_path(blocks_path(preproc_path)))
+    return os.path.getmtime(preproc_path)
+
+def split_frames(arrays, index):
+    '''
+    Numerical and text DataFrames of column arrays. The arrays are used as they are (no concatenation or copy).
+    '''
+    df_numeric = pd.DataFrame({column: array for column, array in arrays.items() if array.dtype != object}, index=index, copy=False)
+    df_text = pd.DataFrame({column: array for column, array in arrays.items() if array.dtype == object}, index=index, copy=False)
+    return df_numeric, df_text
+
 def read_preproc_data(file_path):
-    
+
+    # Block store: the numerical and text columns are read directly into separate DataFrames
+    if blockstore.exists(blocks_path(file_path)):
+        df_numeric, df_text, loading = read_preproc_data_async(file_path)
+        return loading.result()
+
     chunksize = 10000
     chunk_list = []
     
-    # TODO: add advanced and normal column lists 
-    
-    # Read large data in chunks
+    # Read large data in chunks (normal variables only, see read_advanced_data)
     for chunk in pd.read_csv(file_path, index_col=0, compression='infer', chunksize=chunksize, delimiter=";"):
         chunk_list.append(chunk)
     df = pd.concat(chunk_list)
+    df.index = timebase.compact_index(df.index)
 
     # Split into numerical and text-based DataFrames
     df_numeric = df.select_dtypes(include=['number'])
@@ -151,6 +264,75 @@ def read_preproc_data(file_path):
     
     return df_numeric, df_text
 
+def read_preproc_data_async(file_path, first_columns=None):
+    '''
+    Read the columns that are needed first (e.g. the visible ones) and return them, the other columns are read in
+    the background. Columns and blocks are decompressed in parallel by the thread pool of the block store.
+    Returns the numerical and text DataFrames of the first columns and a Future of the complete DataFrames.
+    With the gzip CSV cache every column is read before returning.
+    '''
+    directory = blocks_path(file_path)
+    if not blockstore.exists(directory):
+        df_numeric, df_text = read_preproc_data(file_path)
+        loading = Future()
+        loading.set_result((df_numeric, df_text))
+        return df_numeric, df_text, loading
+    
+    manifest = blockstore.read_manifest(directory)
+    index = blockstore.read_index(directory, manifest)
+    columns = [column for column in blockstore.column_names(directory, manifest) if column not in advanced_columns]
+    first = [column for column in columns if first_columns is None or column in first_columns]
+    arrays = blockstore.read_columns(directory, first, manifest)
+    
+    def read_rest():
+        rest = blockstore.read_columns(directory, [column for column in columns if column not in first], manifest)
+        return split_frames({column: arrays[column] if column in arrays else rest[column] for column in columns}, index)
+    
+    # The complete frames reuse the arrays of the first columns
+    executor = ThreadPoolExecutor(max_workers=1)
+    loading = executor.submit(read_rest)
+    executor.shutdown(wait=False)
+    return *split_frames(arrays, index), loading
+
+def advanced_path(preproc_path):
+    return preproc_path.replace("_PREPROC.gz", "_ADVANCED.gz")
+
+def read_advanced_data(file_path):
+    '''
+    Read the advanced variables of a preprocessed file.
+    '''
+    if blockstore.exists(blocks_path(file_path)):
+        directory = blocks_path(file_path)
+        return blockstore.read_frame(directory, [column for column in advanced_columns if column in blockstore.column_names(directory)])
+
+    df = pd.read_csv(advanced_path(file_path), index_col=0, compression='infer', delimiter=";")
+    df.index = timebase.compact_index(df.index)
+    return df
+
+def read_columns(file_path, columns):
+    '''
+    Read selected columns of a preprocessed file (normal or advanced), the other columns are not parsed.
+    Raises KeyError if a column is not in the file (in both cache formats).
+    '''
+    if blockstore.exists(blocks_path(file_path)):
+        return blockstore.read_frame(blocks_path(file_path), columns)
+
+    normal = [column for column in columns if column not in advanced_columns]
+    advanced = [column for column in columns if column in advanced_columns]
+    
+    # Only the header lines are read to check the columns
+    for path, part in ((file_path, normal), (advanced_path(file_path), advanced)):
+        if part:
+            header = pd.read_csv(path, nrows=0, compression='infer', delimiter=";").columns
+            missing = [column for column in part if column not in header]
+            if missing:
+                raise KeyError(f"Columns not found in {path}: {missing}")
+    parts = [pd.read_csv(path, index_col="Sample", usecols=["Sample"] + part, compression='infer', delimiter=";")
+             for path, part in ((file_path, normal), (advanced_path(file_path), advanced)) if part]
+    df = pd.concat(parts, axis=1)
+    df.index = timebase.compact_index(df.index)
+    return df[columns]
+
 def raw_to_mmHg(raw, sensitivity=0.149924):
     '''
     Convert raw AD-value to mmHg.
@@ -184,10 +366,9 @@ def extract_battery(series):
 
 def pulse_bpm(df):
     
-    return df.apply(
-        lambda row: (60.0*fs) / float(row['BPUpdate']) 
-        if (float(row['BPDiff']) >= 1.2 and float(row['BPUpdate']) > 0) 
-        else 0.0, axis=1)
+    bp_update = df['BPUpdate'].astype(float)
+    valid = (df['BPDiff'].astype(float) >= 1.2) & (bp_update > 0)
+    return ((60.0*fs) / bp_update.where(valid, 1.0)).where(valid, 0.0)
 
 def extract_sensitivity(column):
     
@@ -208,18 +389,16 @@ def extract_sensitivity(column):
     
     return bsn, tsn
     
-def convert_data(df, advanced_mode=False):
+def convert_data(df):
     global bsn, tsn
         
     # Remove whitespace characters
     df.columns = df.columns.str.strip()
     
-    # Scale time axis
-    df = df.rename_axis("Time")
-    df.index = df.index / fs_index
+    # Integer sample index, the time axis is given by the time base (see timebase.py)
+    df = df.rename_axis("Sample")
     
     # Extract non-numerical values
-    text_columns = ["Comment", "Alarm", "UI", "Wire"]
     df_text = df[text_columns].copy()
     df_text = df_text.applymap(str.strip)
     bsn, tsn = extract_sensitivity(df_text["Comment"])
@@ -227,59 +406,39 @@ def convert_data(df, advanced_mode=False):
     # Remove unused variables
     df.drop(['Comment', 'Alarm', 'UI', 'Wire', 'TipComp', 'BalloonComp', 'TipJOFR', 'BalloonJOFR', 'Raw0', 'Raw1', 'BattRaw', 'VrefintRaw'], 
             axis=1, inplace=True)
-    
-    # Drop advanced variables
-    if not advanced_mode:
-        df.drop(['SlowBPDiff', 'BPStable', 'BalloonHigh', 'BalloonLow', 'BalloonDiff', 'AirTemp', 'AirPres',
-                 'SubjTemp', 'VrefintFast', 'VrefintSlow', 'TgtSpeed', 'CurSpeed'], 
-                axis=1, inplace=True)
-    # Keep advanced variables
-    else:
-        df["BPDiff"] = df["BPDiff"].astype(float) / 10
-        df["SlowBPDiff"] = df["SlowBPDiff"].astype(float) / 10
-        df["BPStable"] = df["BPStable"].astype(float)
-        df["BalloonHigh"] = df["BalloonHigh"].astype(float) / 10
-        df["BalloonLow"] =  df["BalloonLow"].astype(float) / 10
-        df["BalloonDiff"] = df["BalloonDiff"].astype(float) / 10
-        df["AirTemp"] = df["AirTemp"].astype(float) / 10
-        df["AirPres"] = df["AirPres"].astype(float) / 10 - 750
-        df["SubjTemp"] = df["SubjTemp"].astype(float) / 10
-        df["VrefintFast"] = (df["VrefintFast"].astype(float) * 30) / 4095
-        df["VrefintSlow"] = (df["VrefintSlow"].astype(float) * 30) / 4095
-        df["TgtSpeed"] = df["TgtSpeed"].astype(float) / 100
-        df["CurSpeed"] = df["CurSpeed"].astype(float) / 100
-        df["BVPoints"] = df["BVDebug"].apply(lambda x: (int(x) >> 24) * 10)
-        df["BVState"] = df["BVDebug"].apply(lambda x: ((int(x) >> 16) & 0x0F) * 10)
-        df["BVFlags"] = df["BVDebug"].apply(lambda x: (int(x) & 0x0F) * 10 - 150)
-        # df["Balloon period"] =   PlotGraphOptional(lambda samples: self.upd_time(samples[14], samples[15], samples[0])
-        df["PW pos"] = df["PumpWheel"].apply(lambda x: (s16(int(x) >> 16)) / 1000) 
-        df["PW State"] =  df["PumpWheel"].apply(lambda x: ((int(x) >> 4) & 0x0F) * 10)
-        df["PW Illegal"] =  df["PumpWheel"].apply(lambda x: ((int(x) >> 8) & 0x00FF) * 10)
-        df["GPIO HallA"] =  df["PumpWheel"].apply(lambda x: ((int(x) >> 0) & 0x01) * 10 - 20)
-        df["GPIO HallB"] =  df["PumpWheel"].apply(lambda x: ((int(x) >> 1) & 0x01) * 10 - 21) 
             
     # Convert data to numerical type, discard corrupted data rows
     df = df.apply(pd.to_numeric, errors='coerce')
     df.dropna(inplace=True, axis=0)  
+    df_text = df_text.loc[df.index]
     
+    # Normal variables (derived signals, e.g. MAP, Pulse BPM or the buttons are defined in derived.py)
     df["Fast0"] = raw_to_mmHg(df["Fast0"], sensitivity=tsn)
     df["Slow0"] = raw_to_mmHg(df["Slow0"], sensitivity=tsn)
     df["Fast1"] = raw_to_mmHg(df["Fast1"], sensitivity=bsn)
     df["Slow1"] = raw_to_mmHg(df["Slow1"], sensitivity=bsn)
     df["Systolic"] = df["Systolic"].astype(float) / 10
     df["Diastolic"] = df["Diastolic"].astype(float) / 10
-    df["MAP"] = (df["Systolic"] + 2 * df["Diastolic"]) / 3.0
-    df["Pulse BPM"] = pulse_bpm(df)
-    df["Inflate"] = df['Buttons'].apply(lambda x: (int(x) & 0x03) * 100)
-    df["Deflate"] = df['Buttons'].apply(lambda x: ((int(x) & 0x0C) >> 2) * 100)
-    df["Alarm Ack"] = df['Buttons'].apply(lambda x: ((int(x) & 0x30) >> 4) * 100)
     df["State"] = df["State"].astype(float) * 10
     df["MotorPos"] = df["MotorPos"].astype(float) / 1000              
-    df["PW HallA"] =  df["PumpWheel"].apply(lambda x: ((int(x) >> 2) & 0x01) * 10 - 32)
-    df["PW HallB"] =  df["PumpWheel"].apply(lambda x: ((int(x) >> 3) & 0x01) * 10 - 33)
     df["BattFast"] = (df["BattFast"].astype(float) * 100) / 4095
     df["BattSlow"] = (df["BattSlow"].astype(float) * 100) / 4095                       
     
+    # Advanced variables
+    df["SlowBPDiff"] = df["SlowBPDiff"].astype(float) / 10
+    df["BPStable"] = df["BPStable"].astype(float)
+    df["BalloonHigh"] = df["BalloonHigh"].astype(float) / 10
+    df["BalloonLow"] =  df["BalloonLow"].astype(float) / 10
+    df["BalloonDiff"] = df["BalloonDiff"].astype(float) / 10
+    df["AirTemp"] = df["AirTemp"].astype(float) / 10
+    df["AirPres"] = df["AirPres"].astype(float) / 10 - 750
+    df["SubjTemp"] = df["SubjTemp"].astype(float) / 10
+    df["VrefintFast"] = (df["VrefintFast"].astype(float) * 30) / 4095
+    df["VrefintSlow"] = (df["VrefintSlow"].astype(float) * 30) / 4095
+    df["TgtSpeed"] = df["TgtSpeed"].astype(float) / 100
+    df["CurSpeed"] = df["CurSpeed"].astype(float) / 100
+    # df["Balloon period"] =   PlotGraphOptional(lambda samples: self.upd_time(samples[14], samples[15], samples[0])
+    
     # Decode variable names
     df.rename(columns={'Fast0': 'Tip, fast',
                        'Slow0': 'Tip, slow',
@@ -287,10 +446,6 @@ def convert_data(df, advanced_mode=False):
                        'Slow1': 'Balloon, slow'
                        }, inplace=True)
     
-    # Drop unused variables
-    df.drop(['PumpWheel', 'Buttons', 'BVDebug', 'BPDiff', 'BPUpdate'], 
-            axis=1, inplace=True)
-    
     # Convert all columns to int
     df = df.apply(lambda col: col.astype(int) if col.name != df.index.name else col)
     
@@ -321,6 +476,11 @@ def open_datafile():
     
     # Prompt user for data file
     file_path = find_file()
+    return get_preproc_file(file_path)
+
+def get_preproc_file(file_path):
+    
+    # Return the preprocessed file of a data file, preprocess it if needed
     file_dir, file_name = os.path.split(file_path)
     file_base, file_ext = os.path.splitext(file_name)
     
@@ -331,7 +491,7 @@ def open_datafile():
         meta_file_path = os.path.join(file_dir, f"{file_base}_metadata.csv")
         
         # Case 1: Preprocessed file does not exist
-        if not os.path.exists(gz_file_path):
+        if not cache_exists(gz_file_path):
             print("Preprocessing the selected file...")
             return preprocess_file(file_path, export=True)
     
@@ -340,12 +500,22 @@ def open_datafile():
             print("The meta file is not found. A new version will be created.")
             return preprocess_file(file_path, export=True)
     
-        # Case 3: Metadata file exists but version is outdated
+        # Case 3: Advanced variables file does not exist (gzip CSV cache only, the block store keeps every column)
+        if not blockstore.exists(blocks_path(gz_file_path)) and not os.path.exists(advanced_path(gz_file_path)):
+            print("The advanced variables file is not found. A new version will be created.")
+            return preprocess_file(file_path, export=True)
+    
+        # Case 4: Section table does not exist
+        if not os.path.exists(sections_path(gz_file_path)):
+            print("The section table is not found. A new version will be created.")
+            return preprocess_file(file_path, export=True)
+    
+        # Case 5: Metadata file exists but version is outdated
         if not check_version(meta_file_path, expected_version=sw_version):
             print("The preprocessed file was created with incorrect SW version. A new version will be created.")
             return preprocess_file(file_path, export=True)
     
-        # Case 4: All checks pass
+        # Case 6: All checks pass
         print("A preprocessed file is available and will be opened.")
         return gz_file_path
     
@@ -353,6 +523,20 @@ def open_datafile():
         print("ERROR: Unsupported file type.")
         return None
     
+def read_metadata(meta_path):
+    '''
+    Read the metadata file into a dictionary (e.g. "Catheter ID", "HW revision").
+    '''
+    metadata = {}
+    with open(meta_path, mode='r', encoding='utf-8') as file:
+        for line in file:
+            
+            # Keys are separated from the values either by ':' or by a block of whitespaces
+            match = re.match(r"\s*(.+?)(?::\s*|\s{2,})(.*)$", line.rstrip("\n"))
+            if match:
+                metadata[match.group(1).strip()] = match.group(2).strip()
+    return metadata
+
 def check_version(meta_path, expected_version):
     
     sw_version = None
@@ -376,14 +560,32 @@ def preprocess_file(file_path=None, export=False):
     
     # Import and clean data
     if not file_path: file_path = find_file()
-    sections, metadata = read_raw_data(file_path)
+    with memprofile.stage("read_raw_data"):
+        sections, metadata = read_raw_data(file_path)
 
     print("Number of sections detected: ", len(sections))
 
-    df_raw = pd.concat(sections, ignore_index=True)
-    df_num, df_text = convert_data(df_raw)
-    df_merged = pd.concat([df_num, df_text], axis=1)
-
+    # The intermediate frames are released as soon as they are not needed (see memprofile.py)
+    with memprofile.stage("concat sections"):
+        original_index = np.concatenate([section.index.to_numpy(dtype=np.int64) for section in sections]) \
+            if sections else np.array([], dtype=np.int64)
+        section_id = np.repeat(np.arange(len(sections)), [len(section) for section in sections])
+        df_raw = pd.concat(sections, ignore_index=True)
+        del sections
+    with memprofile.stage("convert_data", rows=len(df_raw)):
+        df_num, df_text = convert_data(df_raw)
+        del df_raw
+    
+    # Section table and sample index of the rows kept by convert_data, rows with a corrupted Index are removed
+    raw_rows = df_num.index.to_numpy()
+    skip = misordered_rows(original_index[raw_rows], section_id[raw_rows], raw_rows)
+    if skip.any():
+        print("Rows with a corrupted Index removed: ", int(skip.sum()))
+        df_num, df_text, raw_rows = df_num[~skip], df_text[~skip], raw_rows[~skip]
+    section_table = build_section_table(original_index[raw_rows], section_id[raw_rows], raw_rows)
+    df_num.index = df_text.index = sample_index(section_table, original_index[raw_rows])
+    del original_index, section_id, raw_rows
+    normal_columns = [column for column in df_num.columns if column not in advanced_columns]
     
     metadata.append(f"BSN:\t\t\t\t\t{bsn}")
     metadata.append(f"TSN:\t\t\t\t\t{tsn}")
@@ -397,15 +599,61 @@ def preprocess_file(file_path=None, export=False):
         
         # Export preprocessed data file
         file_path_preproc = f"{base_name}_PREPROC.gz"
-    
-        df_merged.to_csv(
-            file_path_preproc,
-            index=True,
-            header=True,
-            sep=";",
-            encoding="utf-8",
-            compression="gzip"
-        )
+        
+        # Derived signals stored for the previous version (the block store removes its own when it is written)
+        if os.path.exists(derived.derived_path(file_path_preproc)):
+            os.remove(derived.derived_path(file_path_preproc))
+        
+        # Block store of every column (the key of the recording is still the _PREPROC.gz path)
+        if cache_format == "blocks":
+            with memprofile.stage("export blocks", rows=len(df_num)):
+                blockstore.write_frame(blocks_path(file_path_preproc), pd.concat([df_num, df_text], axis=1))
+            print(f"Block store successfully exported to {blocks_path(file_path_preproc)}")
+        
+        else:
+            with memprofile.stage("export gzip", rows=len(df_num)):
+                if blockstore.exists(blocks_path(file_path_preproc)):
+                    os.remove(blockstore.manifest_path(blocks_path(file_path_preproc)))   # Outdated block store
+                df_merged = pd.concat([df_num[normal_columns], df_text], axis=1)
+                df_merged.to_csv(
+                    file_path_preproc,
+                    index=True,
+                    header=True,
+                    sep=";",
+                    encoding="utf-8",
+                    compression="gzip"
+                )
+                del df_merged
+        
+                # Export advanced variables
+                df_num[advanced_columns].to_csv(
+                    advanced_path(file_path_preproc),
+                    index=True,
+                    header=True,
+                    sep=";",
+                    encoding="utf-8",
+                    compression="gzip"
+                )
+        
+        # Export section table
+        section_table.to_csv(sections_path(file_path_preproc), index=False, sep=";")
+        
+        # One time base for the summary, the beats and the messages
+        tb = timebase.TimeBase.from_index(df_num.index, fs_index)
+        
+        # Export summary statistics (of the stored and all derived signals)
+        with memprofile.stage("summary", rows=len(df_num)):
+            df_all = derived.add_signals(None, df_num, list(derived.derived_signals))
+            summary.export_summary(summary.compute_summary(df_all, fs_index, section_table, tb), summary.summary_path(file_path_preproc))
+            del df_all
+        
+        # Export beat table
+        with memprofile.stage("beats", rows=len(df_num)):
+            beats.export_beats(beats.compute_beats(df_num, fs_index, section_table, tb), beats.beats_path(file_path_preproc))
+        
+        # Export message index
+        with memprofile.stage("message index", rows=len(df_text)):
+            message_search.export_index(message_search.build_index(df_text, fs_index, tb=tb), message_search.messages_path(file_path_preproc))
         
         print("Preprocessed file exported successfully.")
         return file_path_preproc
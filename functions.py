@@ -6,11 +6,19 @@ Created on Wed Jan 15 13:08:35 2025
 
 BEAT visualization tool - Functions
 """
+import base64
 import plotly.graph_objects as go
+import plotly.colors
 import psutil
-from dash import html
+from dash import html, dcc
+import numpy as np
+import file_handler as fh
+import summary
+import timebase
+import beats
 
 bg_colour = '#d6eaf8'  #Light blue-grey
+default_items = ["Systolic", "Battery", "Inflate", "Catheter", "Balloon, slow", "State"]
 
 def release_port(port):
     for proc in psutil.process_iter(['pid', 'name', 'connections']):
@@ -86,9 +94,32 @@ def show_alarms(figure, X0, X1, color="yellow", label="", shape_id="alarm_line",
     
     return figure
     
-def display_figure(df, title):
+colorway = plotly.colors.qualitative.Plotly    # Default trace colours
+
+def typed_array(values, precision="f4"):
+    '''
+    Encode an array as a base64 typed array (plotly.js >= 2.28) instead of a JSON list of decimal numbers.
+    Integers are stored in the smallest type that holds them, floats in single precision by default.
+    '''
+    array = np.asarray(values)
+    if array.dtype.kind == "b":
+        array = array.astype(np.uint8)
+    elif array.dtype.kind in "iu" and len(array):
+        lo, hi = array.min(), array.max()
+        for dtype in (np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32):
+            if np.iinfo(dtype).min <= lo and hi <= np.iinfo(dtype).max:
+                array = array.astype(dtype)
+                break
+        else:
+            array = array.astype(np.float64)
+    elif array.dtype.kind not in "iu":
+        array = array.astype(precision)
+    
+    array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+    return {"dtype": array.dtype.str[1:], "bdata": base64.b64encode(array.tobytes()).decode("ascii")}
+
+def display_figure(df, title, gaps=None, tb=None):
     
-    default_items = ["Systolic", "Battery", "Inflate", "Catheter", "Balloon, slow", "State"]
     color_mapping = {
         "State": "black",
         "Inflate": "red"
@@ -96,18 +127,47 @@ def display_figure(df, title):
     
     fig = go.Figure()
     
-    for column in df.columns:
+    # Uniform sampling: the x axis of a trace is given by its start and step, no time array is sent.
+    # The lines are only split at the gaps, each part of a variable is a separate trace of the same legend group.
+    # Missing samples within a part (e.g. dropped corrupted rows) are filled with NaN, so the part stays uniformly
+    # sampled. If most of a part is missing, the time of every row is sent instead (typed array).
+    if tb is None:
+        tb = timebase.TimeBase.from_index(df.index, fh.fs_index)
+    edges = np.unique(np.concatenate(([0], gaps if gaps is not None else [], [len(df)]))).astype(int)
+    samples = df.index.to_numpy()
+    
+    parts = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        positions = samples[start:end] - samples[start]
+        span = int(positions[-1]) + 1
+        if span == end - start:
+            parts.append((start, end, dict(x0=float(tb.time(start)), dx=1 / fh.fs_index), None))
+        elif span <= 2 * (end - start):
+            parts.append((start, end, dict(x0=float(tb.time(start)), dx=1 / fh.fs_index), positions))
+        else:
+            parts.append((start, end, dict(x=typed_array(tb.time(np.arange(start, end)), precision="f8")), None))
+    
+    for j, column in enumerate(df.columns):
         visibility = True if column in default_items else False
-        fig.add_trace(
-            go.Scatter(
-                x=df.index, 
-                y=df[column], 
-                name=column, 
-                mode="lines", 
-                visible=visibility if visibility else "legendonly",
-                line=dict(color=color_mapping.get(column)),
+        color = color_mapping.get(column, colorway[j % len(colorway)])
+        values = df[column].to_numpy()
+        for i, (start, end, x_axis, positions) in enumerate(parts):
+            y = values[start:end]
+            if positions is not None:
+                y = np.full(int(positions[-1]) + 1, np.nan, dtype=np.float32)
+                y[positions] = values[start:end]
+            fig.add_trace(
+                go.Scatter(
+                    **x_axis,
+                    y=typed_array(y), 
+                    name=column, 
+                    legendgroup=column,
+                    showlegend=(i == 0),
+                    mode="lines", 
+                    visible=visibility if visibility else "legendonly",
+                    line=dict(color=color),
+                )
             )
-        )
 
     fig.update_layout(
         height=600,
@@ -123,81 +183,55 @@ def display_figure(df, title):
     
     return fig
 
-def measure_time(df, state_start, state_end):
+def measure_time(df, state_start, state_end, tb=None):
     """
-    Measures the elapsed time during specific events (inflation, deflation, etc.), based on the State and Time signal.
+    Measures the elapsed time during specific events (inflation, deflation, etc.), based on the State signal and the time base.
     """
     try:
-        if ('Time' != df.index.name) or ('State' not in df):
-            raise KeyError("The DataFrame must contain 'Time' and 'State' columns.")
+        if ('Sample' != df.index.name) or ('State' not in df):
+            raise KeyError("The DataFrame must contain 'Sample' index and 'State' column.")
 
-        elapsed_times = []  
-        event = False
-        for i, value in df['State'].items():
-            
-            # Start of event
-            if (value == state_start) and not event:
-                start_time = i
-                event = True
-            
-            # End of event
-            if (value == state_end) and event:
-                end_time = i
-                duration = end_time - start_time
-                if duration > 1:
-                    elapsed_times.append({
-                        "start_time": start_time,
-                        "end_time": end_time,
-                        "duration": duration
-                    })
-                event = False
-        return elapsed_times
+        if tb is None:
+            tb = timebase.TimeBase.from_index(df.index, fh.fs_index)
+        rows = summary.transition_rows(df['State'].to_numpy(), state_start, state_end)
+        return [{
+                    "start_time": float(tb.time(start)),
+                    "end_time": float(tb.time(end)),
+                    "duration": float(tb.time(end) - tb.time(start))
+                } for start, end in rows if tb.time(end) - tb.time(start) > 1]
 
     except Exception as e:
         print(f"Error in measure_time: {e}")
         return None
     
-def measure_duration(df, state):
+def measure_duration(df, state, tb=None):
     """
-    Measures the duration of specific states (Pause, etc.), based on the State and Time signal.
+    Measures the duration of specific states (Pause, etc.), based on the State signal and the time base.
     """
     try:
-        if ('Time' != df.index.name) or ('State' not in df):
-            raise KeyError("The DataFrame must contain 'Time' and 'State' columns.")
+        if ('Sample' != df.index.name) or ('State' not in df):
+            raise KeyError("The DataFrame must contain 'Sample' index and 'State' column.")
 
-        elapsed_times = []  
-        event = False
-        for i, value in df['State'].items():
-            
-            # Start of event
-            if (value == state) and not event:
-                start_time = i
-                event = True
-            
-            # End of event
-            if (value != state) and event:
-                end_time = i
-                duration = end_time - start_time
-                if duration > 1:
-                    elapsed_times.append({
-                        "start_time": start_time,
-                        "end_time": end_time,
-                        "duration": duration
-                    })
-                event = False
-        return elapsed_times
+        if tb is None:
+            tb = timebase.TimeBase.from_index(df.index, fh.fs_index)
+        rows = summary.state_rows(df['State'].to_numpy(), state)
+        return [{
+                    "start_time": float(tb.time(start)),
+                    "end_time": float(tb.time(end)),
+                    "duration": float(tb.time(end) - tb.time(start))
+                } for start, end in rows if tb.time(end) - tb.time(start) > 1]
 
     except Exception as e:
         print(f"Error in measure_inflation: {e}")
         return None
 
-def measure_inflation(df):
+def measure_inflation(phases):
     
-    # Measure inlfation and deflation times
-    time_to_inflation = measure_time(df, 30, 50)[0]
-    inflation_times = measure_time(df, 50, 80)
-    deflation_times = measure_time(df, 100, 30)
-    pause_times = measure_duration(df, 120)
+    # Inflation and deflation times, as measured at preprocessing time
+    time_to_inflation = (phases["time to inflation"] or [{'start_time': 0, 'end_time': 0, 'duration': 0}])[0]
+    inflation_times = phases["inflation"]
+    deflation_times = phases["deflation"]
+    pause_times = phases["pause"]
     
     # Dynamically generate the event info content
     event_info_content = html.Div(
@@ -252,18 +286,22 @@ def measure_inflation(df):
     
     return event_info_content
 
-def extract_data(df, zoom_range, variable):
+def extract_data(df, zoom_range, variable, summary=None, tb=None):
     
-    # No zoom range selected, take the full range of the index
+    # No zoom range selected, use the statistics computed at preprocessing time
     if zoom_range is None or 'x_min' not in zoom_range or 'x_max' not in zoom_range:
+        if summary and variable in summary["columns"]:
+            return display_column_summary(summary["columns"][variable], variable)
         extracted_data = df[variable]
         zoom_info = "Full Range (No Zoom)"
     
     else:
         # Extract the data in the zoomed range
         x_min, x_max = zoom_range['x_min'], zoom_range['x_max']
-        mask = (df.index >= x_min) & (df.index <= x_max)
-        extracted_data = df.loc[mask, variable]
+        if tb is None:
+            tb = timebase.TimeBase.from_index(df.index, fh.fs_index)
+        rows = tb.slice(x_min, x_max)
+        extracted_data = df[variable].iloc[rows]
         zoom_info = f"Zoom Range: [{round(x_min)} - {round(x_max)}] s"
       
     # Display results
@@ -281,7 +319,100 @@ def extract_data(df, zoom_range, variable):
     
     return output
 
-def measure_text_duration(df, column="Alarm", max_gap=3):
+def display_column_summary(stats, variable):
+    
+    # Histogram of the full recording
+    edges = stats["histogram"]["edges"]
+    histogram = go.Figure(go.Bar(
+        x=[(edges[i] + edges[i + 1]) / 2 for i in range(len(edges) - 1)],
+        y=stats["histogram"]["counts"],
+        marker_color="darkblue"
+    ))
+    histogram.update_layout(height=250, width=600, margin=dict(l=20, r=20, t=30, b=20), 
+                            title=f"Histogram: {variable}", paper_bgcolor=bg_colour)
+    
+    output = html.Div([
+        html.P("Full Range (No Zoom)"),
+        html.P(f"Selected variable: {variable}"),
+        html.P(f"Average: {stats['mean']}", style={'fontWeight': 'bold'}),
+        html.P(f"Min: {stats['min']}", style={'fontWeight': 'bold'}),
+        html.P(f"Max: {stats['max']}", style={'fontWeight': 'bold'}),
+        html.P(f"Standard deviation: {stats['std']}", style={'fontWeight': 'bold'}),
+        html.P("Percentiles: " + ", ".join(f"P{p} = {value}" for p, value in stats["percentiles"].items())),
+        dcc.Graph(figure=histogram, config={'displayModeBar': False}),
+        ])
+    
+    return output
+
+def display_summary(summary):
+    
+    cell_style = {'padding': '4px 12px', 'textAlign': 'right'}
+    
+    # Statistics of every signal
+    header = ["Variable", "Min", "Max", "Mean", "Std", "P5", "P50", "P95"]
+    rows = [html.Tr([html.Td(column)] + [html.Td(value, style=cell_style) for value in 
+                    (stats["min"], stats["max"], stats["mean"], stats["std"],
+                     stats["percentiles"]["5"], stats["percentiles"]["50"], stats["percentiles"]["95"])])
+            for column, stats in summary["columns"].items()]
+    table = html.Table([html.Tr([html.Th(name, style=cell_style) for name in header])] + rows)
+    
+    # Time spent in each state
+    time_in_state = [html.P(f"State {state}: {round(duration)} s") for state, duration in summary.get("time_in_state", {}).items()]
+    
+    return html.Div([
+        html.P(f"Duration: {round(summary['duration'])} s, {summary['rows']} samples"),
+        table,
+        html.H4("Time in state", style={'marginTop': '20px'}),
+        *time_in_state
+        ])
+
+def display_sections(sections):
+    
+    # Continuous parts of the recording and the gaps between them
+    children = [html.P(f"Number of parts: {len(sections)}, gaps: {int(sections['gap'].sum())}")]
+    for part in sections.itertuples():
+        children.append(html.P(
+            f"Part {part.Index + 1} (section {part.section + 1}): [{round(part.start_sample / fh.fs_index)} - "
+            f"{round((part.start_sample + part.rows) / fh.fs_index)}] s, {part.rows} samples, first Index = {part.first_index}"
+            + (", after a gap" if part.gap else "")
+        ))
+    return html.Div(children)
+
+def display_phase_stats(summary, variable):
+    
+    # Statistics of the selected variable during every phase of the inflation cycle
+    children = [html.P(f"Selected variable: {variable}")]
+    for phase, events in summary["phases"].items():
+        for i, event in enumerate(events):
+            stats = event["stats"].get(variable)
+            if stats:
+                children.append(html.P(
+                    f"{phase.capitalize()} {i+1}: [{round(event['start_time'])} - {round(event['end_time'])}] s, "
+                    f"Average = {stats['mean']}, Min = {stats['min']}, Max = {stats['max']}, Std = {stats['std']}"
+                ))
+    return html.Div(children)
+
+def display_beat_stats(table, zoom_range, variable):
+    
+    # Statistics of the detected beats, taken from the beat table
+    if zoom_range is None or 'x_min' not in zoom_range or 'x_max' not in zoom_range:
+        stats = beats.window_stats(table)
+        zoom_info = "Full Range (No Zoom)"
+    else:
+        stats = beats.window_stats(table, zoom_range['x_min'], zoom_range['x_max'])
+        zoom_info = f"Zoom Range: [{round(zoom_range['x_min'])} - {round(zoom_range['x_max'])}] s"
+    
+    if stats is None:
+        return html.Div([html.P(zoom_info), html.P(f"No beats are detected in {variable}.")])
+    
+    children = [html.P(zoom_info), html.P(f"Selected variable: {variable}, beats: {stats['beats']}")]
+    for metric, label in (("systolic", "Systolic"), ("diastolic", "Diastolic"), ("map", "MAP"), ("bpm", "Heart rate (bpm)")):
+        values = stats[metric]
+        children.append(html.P(f"{label}: Average = {values['mean']}, Min = {values['min']}, Max = {values['max']}, Std = {values['std']}",
+                               style={'fontWeight': 'bold'}))
+    return html.Div(children)
+
+def measure_text_duration(df, column="Alarm", max_gap=3, tb=None):
     """
     Function for collecting the non-numerical variables (such as Alarms, Comments, UI messages, etc.) into sections.
     The motivation is that usually the same message appears repeatedly over a period of time, 
@@ -296,7 +427,13 @@ def measure_text_duration(df, column="Alarm", max_gap=3):
         print(f"There are no {column} found in this file.")
         return []
 
-    for i, value in df[column].dropna().items():
+    # Time (s) of the rows with a message
+    rows = np.flatnonzero(df[column].notna().to_numpy())
+    if tb is None:
+        tb = timebase.TimeBase.from_index(df.index, fh.fs_index)
+    times = tb.time(rows).tolist()
+    
+    for i, value in zip(times, df[column].to_numpy()[rows]):
         
         # Close previous section if the gap is too large
         if active_alarm and (i - prev_idx) > max_gap:
@@ -14,6 +14,14 @@ import webbrowser
 import dash_bootstrap_components as dbc
 import file_handler as fh
 import functions as func
+import comparison as comp
+import export as exp
+import summary
+import timebase
+import derived
+import beats
+import memprofile
+import message_search
 from callbacks import register_callbacks
 
 #------------------------------------------------------------------------------------
@@ -21,7 +29,32 @@ from callbacks import register_callbacks
 
 file_path = fh.open_datafile()
 plot_title="File: " + os.path.basename(file_path)
-df_num, df_text = fh.read_preproc_data(file_path) 
+
+# The visible variables and the messages are loaded first, the other columns are loaded in the background
+first_columns = derived.required_columns(func.default_items) + fh.text_columns
+with memprofile.stage("read_preproc_data"):
+    df_stored, df_text, loading = fh.read_preproc_data_async(file_path, first_columns)
+with memprofile.stage("derived signals", rows=len(df_stored)):
+    df_num = derived.add_signals(file_path, df_stored, derived.available_signals(df_stored, derived.group_signals("normal")))
+sections = fh.read_sections(file_path)
+
+# Time base of the recording, shared by the plot, the statistics and the export (every view has the same index)
+tb = timebase.TimeBase.from_index(df_stored.index, fh.fs_index)
+with memprofile.stage("summary and beats", rows=len(df_num)):
+    
+    # Computing a missing summary or beat table needs every column
+    if not (os.path.exists(summary.summary_path(file_path)) and os.path.exists(beats.beats_path(file_path))):
+        df_stored, df_text = loading.result()
+        df_num = derived.add_signals(file_path, df_stored, derived.group_signals("normal"))
+    stats = summary.load_summary(file_path, df_num, fh.fs_index, sections, tb)
+    beat_table = beats.load_beats(file_path, df_num, fh.fs_index, sections, tb)
+message_index = message_search.load_index(file_path, df_text, fh.fs_index, tb)
+gaps = timebase.gap_rows(sections, df_num.index)
+memprofile.print_report()
+
+# Inflation phases and text messages (shown as overlays, used by the export)
+inf_phases = summary.phase_events(stats)
+text_events = {column: func.measure_text_duration(df_text, column=column, tb=tb) for column in ["Alarm", "UI", "Wire"]}
 
 
 #-----------------------------------------------------------------------------------
@@ -61,21 +94,32 @@ app.layout = html.Div(
         
         # html.Button("Select data file", id='file-button', style={'marginLeft': '20px'}),
         
-        dcc.Graph(id='plot', figure=func.display_figure(df_num, plot_title), config=plot_config, style={"backgroundColor": func.bg_colour}),
+        dcc.Graph(id='plot', figure=func.display_figure(df_num, plot_title, gaps, tb), config=plot_config, style={"backgroundColor": func.bg_colour}),
         html.Button("Inflation phases", id='inflation_button', style={'marginLeft': '60px'}, n_clicks=0),
         html.Button("Alarms", id='alarm_button', style={'marginLeft': '60px'}, n_clicks=0),
         html.Button("UI messages", id='ui_button', style={'marginLeft': '60px'}, n_clicks=0),
         html.Button("Catheter", id='wire_button', style={'marginLeft': '60px'}, n_clicks=0),
+        dcc.RadioItems(
+            id='view_mode',
+            options=[{'label': ' Normal view', 'value': 'normal'}, {'label': ' Advanced view', 'value': 'advanced'}],
+            value='normal',
+            inline=True,
+            inputStyle={'marginLeft': '20px'},
+            style={'display': 'inline-block', 'marginLeft': '60px'}
+            ),
+        dcc.Checklist(
+            id='gap_mode',
+            options=[{'label': f' Break lines at gaps ({len(gaps)})', 'value': 'break'}],
+            value=['break'],
+            inline=True,
+            style={'display': 'inline-block', 'marginLeft': '40px'}
+            ),
         
-        dcc.Store(id='inf-phases-store', data={
-            "inflation": func.measure_time(df_num, 50, 80),
-            "deflation": func.measure_time(df_num, 100, 30),
-            "pause": func.measure_duration(df_num, 120)
-        }),
+        dcc.Store(id='inf-phases-store', data=inf_phases),
         
-        dcc.Store(id='alarms-store', data=func.measure_text_duration(df_text, column="Alarm")),
-        dcc.Store(id='ui-store', data=func.measure_text_duration(df_text, column="UI")),
-        dcc.Store(id='wire-store', data=func.measure_text_duration(df_text, column="Wire")),
+        dcc.Store(id='alarms-store', data=text_events["Alarm"]),
+        dcc.Store(id='ui-store', data=text_events["UI"]),
+        dcc.Store(id='wire-store', data=text_events["Wire"]),
         
         html.H2("Statistics", style={'marginTop': '20px', 'marginLeft': '60px'}),
         
@@ -84,7 +128,11 @@ app.layout = html.Div(
             options=[
                 {'label': 'Select category', 'value': 'none'},
                 {'label': 'Inflation', 'value': 'inflation'},
-                {'label': 'Measure min, max, avg', 'value': 'measure'}
+                {'label': 'Measure min, max, avg', 'value': 'measure'},
+                {'label': 'Phase statistics', 'value': 'phases'},
+                {'label': 'Beat statistics', 'value': 'beats'},
+                {'label': 'Summary of all variables', 'value': 'summary'},
+                {'label': 'Sections and gaps', 'value': 'sections'}
             ],
             value='none', 
             style={'width': '35%', 'marginBottom': '20px', 'marginLeft': '20px'}
@@ -104,6 +152,90 @@ app.layout = html.Div(
         # Store for zoom range
         dcc.Store(id='zoom-store', data=None),
         
+        # Polls the background loading of the columns that are not visible at start
+        dcc.Interval(id='load-poll', interval=500, disabled=loading.done()),
+        
+        html.H2("Message search", style={'marginTop': '20px', 'marginLeft': '60px'}),
+        
+        html.Div(
+            style={'display': 'flex', 'alignItems': 'center', 'marginLeft': '20px'},
+            children=[
+                dcc.Input(id='search_query', type='text', debounce=True, placeholder="Search alarms and messages",
+                          style={'width': '400px', 'marginRight': '20px'}),
+                dcc.Checklist(id='search_regex', options=[{'label': ' Regex', 'value': 'regex'}], value=[],
+                              style={'marginRight': '20px'}),
+                dcc.Dropdown(
+                    id='search_channels',
+                    options=[{'label': column, 'value': column} for column in fh.text_columns],
+                    value=fh.text_columns,
+                    multi=True,
+                    style={'width': '400px', 'marginRight': '20px'}
+                    ),
+                html.Button("Previous", id='search_prev', n_clicks=0, style={'marginRight': '10px'}),
+                html.Button("Next", id='search_next', n_clicks=0),
+            ]),
+        
+        html.Div(id='search_info', style={'marginLeft': '20px', 'marginTop': '10px'}),
+        
+        # Hits of the current page, selecting one moves the plot to it
+        dcc.RadioItems(id='search_hits', options=[], value=None, style={'marginLeft': '20px'}),
+        dcc.Store(id='search-page', data=0),
+        
+        html.H2("Export", style={'marginTop': '20px', 'marginLeft': '60px'}),
+        
+        html.Div(
+            style={'display': 'flex', 'alignItems': 'center', 'marginLeft': '20px'},
+            children=[
+                dcc.Dropdown(
+                    id='export_vars',
+                    options=[{'label': column, 'value': column} for column in list(df_num.columns) + list(df_text.columns)],
+                    value=[column for column in func.default_items if column in df_num],
+                    multi=True,
+                    placeholder="Select variables",
+                    style={'width': '600px', 'marginRight': '20px'}
+                    ),
+                dcc.Dropdown(
+                    id='export_format',
+                    options=[{'label': fmt.upper(), 'value': fmt} for fmt in exp.export_formats],
+                    value='csv',
+                    clearable=False,
+                    style={'width': '150px', 'marginRight': '20px'}
+                    ),
+                html.A("Export zoomed window", id='export_link', href="/export", target="_blank"),
+            ]),
+        
+        html.H2("Comparison", style={'marginTop': '20px', 'marginLeft': '60px'}),
+        
+        html.Div(
+            style={'display': 'flex', 'marginLeft': '20px'},
+            children=[
+                dcc.Dropdown(
+                    id='compare_files',
+                    options=[{'label': comp.recording_name(path), 'value': path} 
+                             for path in comp.find_cached_recordings(os.path.dirname(os.path.abspath(file_path)))],
+                    value=[os.path.abspath(file_path)],
+                    multi=True,
+                    placeholder="Select recordings",
+                    style={'width': '600px', 'marginRight': '20px'}
+                    ),
+                dcc.Dropdown(
+                    id='compare_var',
+                    options=[{'label': column, 'value': column} for column in df_num.columns],
+                    value='Balloon, slow',
+                    clearable=False,
+                    style={'width': '250px', 'marginRight': '20px'}
+                    ),
+                dcc.Dropdown(
+                    id='compare_align',
+                    options=[{'label': label, 'value': event} for event, (label, _) in comp.align_events.items()],
+                    value='inflation',
+                    clearable=False,
+                    style={'width': '250px'}
+                    ),
+            ]),
+        
+        dcc.Graph(id='compare_plot', config=plot_config, style={"backgroundColor": func.bg_colour}),
+        
         dcc.Location(id="redirect", refresh=True)  # Redirect location
     ])
 
@@ -111,7 +243,7 @@ app.layout = html.Div(
 #----------------------------------------------------------------------------------
 # Connect the components via callbacks
 
-register_callbacks(app, df_num, df_text, plot_title)
+register_callbacks(app, df_num, df_text, plot_title, exp.collect_events(inf_phases, text_events), stats, file_path, sections, df_stored, beat_table, loading, message_index, tb)
 
 if __name__ == "__main__":
     
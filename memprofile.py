@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:51:07 2026
+
+@author: agent
+
+BEAT - Memory profiling and budget
+
+The preprocessing and loading steps are wrapped in stages. In profiling mode every stage
+records the Python allocations (tracemalloc) and the resident memory of the process (RSS).
+If a memory budget is set, the RSS is checked after every stage (and periodically while the
+raw file is read), and the processing stops with a report instead of running out of memory.
+
+Settings (environment variables):
+    BEAT_MEMPROFILE=1           record and print the memory of every stage
+    BEAT_MEMORY_BUDGET_MB=4000  stop if the process uses more memory than this
+
+Check of the memory use per million rows of a recording:
+    python memprofile.py <raw file or _PREPROC.gz>
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+import psutil
+
+enabled = os.environ.get("BEAT_MEMPROFILE", "0") == "1"
+memory_budget = int(float(os.environ.get("BEAT_MEMORY_BUDGET_MB", "0")) * 1024**2)    # Bytes, 0: no budget
+
+# Limits of the check, peak traced memory per million rows (MB)
+max_preprocess_per_million = 3000
+max_load_per_million = 400
+
+stages = []         # Records of the stages, in the order they were started
+_running = []       # Stack of the running stages (peaks of nested stages are passed to the parent)
+
+class MemoryBudgetError(MemoryError):
+    pass
+
+def rss():
+    return psutil.Process().memory_info().rss
+
+def start():
+    '''
+    Start recording the allocations (tracemalloc slows down the processing, so it is only used in profiling mode).
+    '''
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def check_budget(stage_name):
+    '''
+    Stop with a report if the process uses more memory than the budget.
+    '''
+    if memory_budget and rss() > memory_budget:
+        raise MemoryBudgetError(f"Memory budget of {memory_budget / 1024**2:.0f} MB exceeded during: {stage_name} "
+                                f"(RSS = {rss() / 1024**2:.0f} MB)\n" + report())
+
+@contextmanager
+def stage(name, rows=None):
+    '''
+    Record the memory use of a processing step. Allocations are measured by tracemalloc, the process memory by RSS.
+    '''
+    if not enabled and not memory_budget:
+        yield
+        return
+
+    start()
+    tracing = tracemalloc.is_tracing()
+    record = {"stage": name, "depth": len(_running), "rows": rows, "rss_before": rss(), "peak": 0}
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        record["traced_before"] = current
+
+        # The peak counter is reset for this stage, the parent keeps its peak so far
+        if _running:
+            _running[-1]["peak"] = max(_running[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+    _running.append(record)
+    stages.append(record)
+    time_start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        _running.pop()
+        record["seconds"] = time.perf_counter() - time_start
+        record["rss_after"] = rss()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            record["peak"] = max(record["peak"], peak) - record["traced_before"]
+            record["traced_delta"] = current - record["traced_before"]
+
+            # The peak counter is shared, so the parent stage gets the peak of this one
+            tracemalloc.reset_peak()
+            if _running:
+                _running[-1]["peak"] = max(_running[-1]["peak"], record["traced_before"] + record["peak"])
+    check_budget(name)
+
+def report():
+    '''
+    Table of the recorded stages (MB). Peak and delta are the Python allocations of the stage, RSS is the process memory after it.
+    '''
+    lines = [f"{'Stage':<34}{'Rows':>10}{'Time (s)':>10}{'Peak':>10}{'Delta':>10}{'RSS':>10}"]
+    for record in stages:
+        if "seconds" not in record:
+            lines.append(f"{'  ' * record['depth'] + record['stage']:<34}{record['rows'] or '':>10}{'running':>10}")
+            continue
+        traced = (f"{record['peak'] / 1024**2:>10.1f}{record['traced_delta'] / 1024**2:>10.1f}" if "traced_delta" in record
+                  else f"{'-':>10}{'-':>10}")
+        lines.append(f"{'  ' * record['depth'] + record['stage']:<34}{record['rows'] or '':>10}{record['seconds']:>10.2f}"
+                     f"{traced}{record['rss_after'] / 1024**2:>10.1f}")
+    return "\n".join(lines)
+
+def print_report():
+    if stages:
+        print("Memory use of the loading stages (MB):")
+        print(report())
+
+def peak_per_million(name):
+    '''
+    Peak traced memory (MB) of the last record of a stage per million rows.
+    '''
+    record = [record for record in stages if record["stage"] == name][-1]
+    return record["peak"] / 1024**2 / (record["rows"] / 1e6)
+
+def check_recording(file_path):
+    '''
+    Preprocess (raw file) and load a recording in profiling mode, then compare the peak memory per million rows
+    with the limits. Returns {stage: (MB per million rows, limit)}.
+    '''
+    import file_handler as fh
+    global enabled
+    enabled, was_enabled = True, enabled
+    try:
+        limits = {"load": max_load_per_million}
+        if not file_path.endswith("_PREPROC.gz"):
+            limits["preprocess"] = max_preprocess_per_million
+            with stage("preprocess"):
+                file_path = fh.preprocess_file(file_path, export=True)
+        with stage("load"):
+            df_num, df_text = fh.read_preproc_data(file_path)
+    finally:
+        enabled = was_enabled
+    for record in stages:
+        record["rows"] = record["rows"] or len(df_num)
+    return {name: (peak_per_million(name), limit) for name, limit in limits.items()}
+
+if __name__ == "__main__":
+
+    # The module is imported again, so the stages of file_handler are recorded in the same place
+    import memprofile
+    results = memprofile.check_recording(sys.argv[1])
+    memprofile.print_report()
+    for name, (value, limit) in results.items():
+        print(f"{name}: {value:.0f} MB per million rows (limit: {limit} MB)")
+    sys.exit(1 if any(value > limit for value, limit in results.values()) else 0)
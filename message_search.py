@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:53:49 2026
+
+@author: agent
+
+BEAT - Message search
+
+The Alarm, UI, Wire and Comment messages of a recording are collected into segments
+(repeats of the same message close to each other) at preprocessing time. A trigram
+index over the distinct messages is saved next to the preprocessed file, so substring
+and regex queries only check the distinct messages and never scan the samples.
+"""
+
+import os
+import re
+import json
+import numpy as np
+import timebase
+
+max_gap = 3         # Repeats of a message closer than this (s) belong to the same segment
+page_size = 20      # Hits per page
+
+def messages_path(preproc_path):
+    return preproc_path.replace("_PREPROC.gz", "_messages.json")
+
+def trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def build_index(df_text, fs_index, columns=None, tb=None):
+    '''
+    Segments of every message channel and the trigram index of the distinct messages.
+    Segment times are in milliseconds, the end is the time of the last repeat.
+    '''
+    if tb is None:
+        tb = timebase.TimeBase.from_index(df_text.index, fs_index)
+    messages, message_ids = [], {}
+    segments = {"message": [], "start_ms": [], "end_ms": []}
+
+    for channel in [column for column in (columns or df_text.columns) if column in df_text]:
+        values = df_text[channel].to_numpy()
+        rows = np.flatnonzero([isinstance(value, str) and value.strip() != "" for value in values])
+        if not len(rows):
+            continue
+
+        # Distinct messages of the channel
+        texts = [values[row].strip() for row in rows]
+        ids = np.array([message_ids.setdefault((channel, text), len(message_ids)) for text in texts])
+        messages += [[channel, text] for channel, text in list(message_ids)[len(messages):]]
+
+        # A new segment starts where the message changes or after a long pause
+        times = tb.time(rows)
+        starts = np.flatnonzero(np.concatenate(([True], (ids[1:] != ids[:-1]) | (np.diff(times) > max_gap))))
+        ends = np.append(starts[1:], len(rows)) - 1
+        segments["message"] += ids[starts].tolist()
+        segments["start_ms"] += np.round(times[starts] * 1000).astype(np.int64).tolist()
+        segments["end_ms"] += np.round(times[ends] * 1000).astype(np.int64).tolist()
+
+    # Segments in time order
+    order = np.argsort(segments["start_ms"], kind="stable")
+    segments = {key: [values[i] for i in order] for key, values in segments.items()}
+
+    # Trigram -> distinct messages
+    index = {}
+    for i, (channel, text) in enumerate(messages):
+        for trigram in trigrams(text):
+            index.setdefault(trigram, []).append(i)
+
+    return {"messages": messages, "segments": segments, "trigrams": index}
+
+def export_index(message_index, file_path):
+
+    with open(file_path, mode='w', encoding='utf-8') as file:
+        json.dump(message_index, file)
+    print(f"Message index successfully exported to {file_path}")
+
+def load_index(preproc_path, df_text=None, fs_index=50, tb=None):
+    '''
+    Read the message index of a preprocessed file. If it is missing, it is built from the messages and saved.
+    The segments are kept as arrays for the search.
+    '''
+    file_path = messages_path(preproc_path)
+    if os.path.exists(file_path):
+        with open(file_path, mode='r', encoding='utf-8') as file:
+            message_index = json.load(file)
+    elif df_text is None:
+        return None
+    else:
+        print("The message index is not found. A new version will be created.")
+        message_index = build_index(df_text, fs_index, tb=tb)
+        export_index(message_index, file_path)
+
+    message_index["segments"] = {key: np.asarray(values, dtype=np.int64) for key, values in message_index["segments"].items()}
+    return message_index
+
+def matching_messages(message_index, query, regex=False, channels=None):
+    '''
+    Distinct messages that match the query (case-insensitive substring or regex).
+    Substring queries of 3+ characters only check the messages that have every trigram of the query.
+    '''
+    messages = message_index["messages"]
+    if regex:
+        try:
+            pattern = re.compile(query, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Invalid regular expression: {e}")
+        candidates = range(len(messages))
+        match = lambda text: pattern.search(text) is not None
+    else:
+        needle = query.lower()
+        candidates = range(len(messages))
+        for trigram in trigrams(needle):
+            candidates = sorted(set(candidates).intersection(message_index["trigrams"].get(trigram, [])))
+        match = lambda text: needle in text.lower()
+
+    return [i for i in candidates if (channels is None or messages[i][0] in channels) and match(messages[i][1])]
+
+def search(message_index, query, regex=False, channels=None, page=0):
+    '''
+    One page of the segments of the matching messages, in time order, the total number of hits and the page number
+    (a page after the last one is moved to the last page).
+    '''
+    if not query:
+        return [], 0, 0
+    ids = matching_messages(message_index, query, regex, channels)
+    segments = message_index["segments"]
+    hits = np.flatnonzero(np.isin(segments["message"], ids))
+
+    page = max(min(page, (len(hits) - 1) // page_size), 0)
+    page_hits = hits[page * page_size:(page + 1) * page_size]
+    return [{"channel": message_index["messages"][segments["message"][i]][0],
+             "message": message_index["messages"][segments["message"][i]][1],
+             "start_ms": int(segments["start_ms"][i]),
+             "end_ms": int(segments["end_ms"][i])} for i in page_hits], len(hits), page
+
+def format_ms(ms):
+    minutes, ms = divmod(int(ms), 60000)
+    return f"{minutes:02d}:{ms / 1000:06.3f}"
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:29:30 2026
+
+@author: agent
+
+BEAT - Summary statistics of a recording
+
+Computed once at preprocessing time and saved next to the preprocessed file, so the
+Statistics panel does not need to touch the samples.
+"""
+
+import os
+import json
+import numpy as np
+import timebase
+
+percentiles = [1, 5, 25, 50, 75, 95, 99]
+histogram_bins = 50
+
+# Phases of the inflation cycle: (detector, State values)
+phase_definitions = {
+    "time to inflation": ("transition", 30, 50),
+    "inflation": ("transition", 50, 80),
+    "deflation": ("transition", 100, 30),
+    "pause": ("state", 120, None),
+}
+
+def summary_path(preproc_path):
+    return preproc_path.replace("_PREPROC.gz", "_summary.json")
+
+def transition_rows(state, state_start, state_end, min_rows=0):
+    '''
+    Row pairs from the first state_start value until the next state_end value.
+    Only the positions of the two values are scanned, the loop runs once per event.
+    '''
+    starts = np.flatnonzero(state == state_start)
+    ends = np.flatnonzero(state == state_end)
+    rows = []
+    i_start = 0
+    while i_start < len(starts):
+        start = starts[i_start]
+        i_end = np.searchsorted(ends, start, side="left")
+        if i_end == len(ends):
+            break
+        end = ends[i_end]
+        if end - start > min_rows:
+            rows.append((int(start), int(end)))
+
+        # The next event can start after the end of the current one
+        i_start = np.searchsorted(starts, end, side="right")
+    return rows
+
+def state_rows(state, value, min_rows=0):
+    '''
+    Row pairs of the continuous runs of a state value (end is the first row after the run).
+    A run that lasts until the end of the recording is not closed.
+    '''
+    mask = np.concatenate(([False], state == value, [False])).astype(np.int8)
+    edges = np.diff(mask)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return [(int(start), int(end)) for start, end in zip(starts, ends)
+            if end < len(state) and end - start > min_rows]
+
+def find_phases(state, fs_index, bounds=None):
+    '''
+    Row pairs of every phase of the inflation cycle. Phases shorter than 1 s are dropped.
+    If row bounds (e.g. of the sections) are given, phases are detected within each of them only.
+    '''
+    if bounds is None:
+        bounds = [(0, len(state))]
+    phases = {phase: [] for phase in phase_definitions}
+    for start, end in bounds:
+        for phase, (detector, value, end_value) in phase_definitions.items():
+            if detector == "transition":
+                rows = transition_rows(state[start:end], value, end_value, min_rows=fs_index)
+            else:
+                rows = state_rows(state[start:end], value, min_rows=fs_index)
+            phases[phase] += [(start + row_start, start + row_end) for row_start, row_end in rows]
+    return phases
+
+def segment_stats(values, rows, columns):
+    '''
+    Mean, min, max and std of every column for every segment, using reduceat over all segments at once.
+    '''
+    if not rows:
+        return []
+    bounds = np.array(rows).ravel()
+    counts = np.diff(bounds)[::2][:, None]
+    sums = np.add.reduceat(values, bounds, axis=0)[::2]
+    squares = np.add.reduceat(values ** 2, bounds, axis=0)[::2]
+    mins = np.minimum.reduceat(values, bounds, axis=0)[::2]
+    maxs = np.maximum.reduceat(values, bounds, axis=0)[::2]
+    means = sums / counts
+    stds = np.sqrt(np.maximum(squares / counts - means ** 2, 0))
+
+    return [{column: {"mean": round(float(means[i, j]), 2), "min": float(mins[i, j]),
+                      "max": float(maxs[i, j]), "std": round(float(stds[i, j]), 2)}
+             for j, column in enumerate(columns)}
+            for i in range(len(rows))]
+
+def compute_summary(df_num, fs_index, sections=None, tb=None):
+    '''
+    Column statistics, histograms, per-phase statistics and time-in-state totals of a recording.
+    With a section table, phases are not allowed to span a device restart or a gap.
+    tb: time base of the recording (built from the index if not given).
+    '''
+    columns = list(df_num.columns)
+    values = df_num.to_numpy(dtype=float)
+    if tb is None:
+        tb = timebase.TimeBase.from_index(df_num.index, fs_index)
+
+    summary = {"rows": len(df_num), "duration": tb.duration, "columns": {}, "phases": {}}    # Holes of the index included
+    if not len(df_num):
+        return summary
+
+    # Column statistics in one pass over the 2D array
+    mins, maxs = values.min(axis=0), values.max(axis=0)
+    means, stds = values.mean(axis=0), values.std(axis=0)
+    pcts = np.percentile(values, percentiles, axis=0)
+    for j, column in enumerate(columns):
+        counts, edges = np.histogram(values[:, j], bins=histogram_bins)
+        summary["columns"][column] = {
+            "min": float(mins[j]),
+            "max": float(maxs[j]),
+            "mean": round(float(means[j]), 2),
+            "std": round(float(stds[j]), 2),
+            "percentiles": {str(p): float(pcts[i, j]) for i, p in enumerate(percentiles)},
+            "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+        }
+
+    if "State" in df_num:
+        state = df_num["State"].to_numpy()
+
+        # Phases of the inflation cycle with the statistics of every signal
+        bounds = timebase.continuous_bounds(sections, df_num.index) if sections is not None else None
+        for phase, rows in find_phases(state, fs_index, bounds).items():
+            stats = segment_stats(values, rows, columns)
+            summary["phases"][phase] = [{
+                "start_time": float(tb.time(start)),
+                "end_time": float(tb.time(end)),
+                "duration": float(tb.time(end) - tb.time(start)),
+                "stats": stats[i]
+            } for i, (start, end) in enumerate(rows)]
+
+        # Time spent in each state
+        states, counts = np.unique(state, return_counts=True)
+        summary["time_in_state"] = {str(int(s)): float(c / fs_index) for s, c in zip(states, counts)}
+
+    return summary
+
+def export_summary(summary, file_path):
+
+    with open(file_path, mode='w', encoding='utf-8') as file:
+        json.dump(summary, file)
+    print(f"Summary successfully exported to {file_path}")
+
+def load_summary(preproc_path, df_num=None, fs_index=50, sections=None, tb=None):
+    '''
+    Read the summary of a preprocessed file. If it is missing, it is computed from the data and saved.
+    '''
+    file_path = summary_path(preproc_path)
+    if os.path.exists(file_path):
+        with open(file_path, mode='r', encoding='utf-8') as file:
+            return json.load(file)
+
+    if df_num is None:
+        return None
+    print("The summary file is not found. A new version will be created.")
+    summary = compute_summary(df_num, fs_index, sections, tb)
+    export_summary(summary, file_path)
+    return summary
+
+def phase_events(summary):
+    '''
+    Phase tables without the statistics (as used by the plot overlays).
+    '''
+    return {phase: [{key: event[key] for key in ("start_time", "end_time", "duration")} for event in events]
+            for phase, events in summary["phases"].items()}
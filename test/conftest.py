@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:01:41 2026
+
+@author: agent
+
+BEAT - Test fixtures
+
+Synthetic raw logs in the format of the device (header, messages and Data: lines),
+so the preprocessing and loading can be tested without the recordings.
+"""
+
+import os
+import sys
+import math
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+columns = ("Index;Raw0;Raw1;Fast0;Slow0;Fast1;Slow1;TipComp;BalloonComp;TipJOFR;BalloonJOFR;State;Systolic;Diastolic;"
+           "BPDiff;SlowBPDiff;BPUpdate;BPStable;BalloonHigh;BalloonLow;BalloonDiff;AirTemp;AirPres;SubjTemp;VrefintFast;"
+           "VrefintSlow;VrefintRaw;BattRaw;BattFast;BattSlow;TgtSpeed;CurSpeed;MotorPos;Buttons;PumpWheel;BVDebug;Comment")
+
+def write_raw_log(file_path, n_rows=20000, n_sections=2, pressure=80, missing=()):
+    '''
+    Write a synthetic raw log of n_rows samples (50 Hz) split into sections. The Index restarts in every section.
+    pressure: baseline of the pressure channels (mmHg), missing: Index values of the first section that are left out.
+    '''
+    per_section = n_rows // n_sections
+    with open(file_path, mode="w", encoding="utf-8") as file:
+        file.write("* * * * * * * * * NEURESCUE\nHW revision                             600100-00-2\n"
+                   "SW version                              v4.0.0\nCurrent log level 3\n")
+        file.write("1-Wire: First connection of catheter 0x1e1a7782\n")
+        for s in range(n_sections):
+            file.write("Data:" + columns + "\n")
+            for i in range(per_section):
+                g = s * per_section + i
+                if s == 0 and i in missing:
+                    continue
+                t = g / 50
+                state = 3 if g < 1000 else 5 if g < 3000 else 8 if g < 4000 else 10 if g < 6000 else 3 if g < 8000 else 12 if g < 9000 else 3
+                raw = int((pressure + 40 * max(0, math.sin(2 * math.pi * 1.2 * t))) / 0.149924)
+                if g in (500, 501):
+                    file.write("Alarm: Low pressure\n")
+                if g == 2000:
+                    file.write("UI: 'Inflate','pressed'\n")
+                if g == 7000:
+                    file.write("1-Wire: catheter removed\n")
+                row = [i, 0, 0, raw, raw, raw, raw, 0, 0, 0, 0, state, 1200, 800, 15, 12, 160, 1, 10, 10, 10, 250, 7600, 370,
+                       4095, 4095, 0, 3600, 3600, 3600, 100, 100, 1000, int(2000 < g < 3000), (g % 16) | (1234 << 16),
+                       (3 << 24) | (2 << 16) | 5, "BSN:0.294013 TSN:0.149924" if i == 0 else ""]
+                file.write("Data:" + ";".join(str(value) for value in row) + "\n")
+    return str(file_path)
+
+@pytest.fixture
+def raw_log(tmp_path):
+    '''
+    Writer of synthetic raw logs into the temporary directory of the test.
+    '''
+    def write(name="recording.txt", **kwargs):
+        return write_raw_log(tmp_path / name, **kwargs)
+    return write
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:05:37 2026
+
+@author: agent
+
+BEAT - Tests of the beat detection
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import beats
+import timebase
+
+fs_index = 50
+
+def waveform(seconds, bpm=72, seed=0):
+    '''
+    Pressure of a beating heart (mmHg, integers like the stored channels) with a slowly changing amplitude,
+    a small ripple (dicrotic notch, noise) and random noise.
+    '''
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * fs_index)) / fs_index
+    amplitude = 40 + 10 * np.sin(2 * np.pi * t / 120)
+    pressure = 80 + amplitude * np.maximum(0, np.sin(2 * np.pi * bpm / 60 * t))
+    pressure += 3 * np.sin(2 * np.pi * 7 * t) + rng.normal(0, 0.5, len(t))
+    return np.round(pressure).astype(np.int64)
+
+def sections_table(parts):
+    '''
+    Section table of continuous parts given as (first sample, samples), every part after the first one after a gap.
+    '''
+    starts = np.cumsum([0] + [samples for _, samples in parts[:-1]])
+    return pd.DataFrame({"section": 0, "start_row": starts, "start_sample": [first for first, _ in parts],
+                         "rows": [samples for _, samples in parts], "first_index": [first for first, _ in parts],
+                         "gap": [False] + [True] * (len(parts) - 1)})
+
+def test_beat_count_and_rate():
+    values = waveform(600)
+    peaks = beats.find_peaks(values, fs_index)
+    metrics = beats.beat_metrics(values, peaks, fs_index)
+
+    # 72 bpm for 10 minutes, the ripples are not counted as beats
+    assert len(peaks) == pytest.approx(720, abs=2)
+    assert np.median(60 / metrics[:, 4]) == pytest.approx(72, abs=1)
+    assert np.all(metrics[:, 1] - metrics[:, 2] > 20)
+
+@pytest.mark.parametrize("chunk_rows", [997, 5000, 12345])
+def test_chunk_size_independence(monkeypatch, chunk_rows):
+    values = waveform(600, seed=1)
+    expected = beats.find_peaks(values, fs_index)
+    monkeypatch.setattr(beats, "chunk_rows", chunk_rows)
+    assert np.array_equal(beats.find_peaks(values, fs_index), expected)
+
+def test_no_beat_spans_a_gap():
+    values = waveform(200)
+    gap_start, gap_end = 3013, 3500     # Samples between them are missing, the part after the gap starts mid-beat
+    samples = np.concatenate((np.arange(0, gap_start), np.arange(gap_end, len(values))))
+    df_num = pd.DataFrame({"Tip, fast": values[samples]}, index=pd.Index(samples, name="Sample"))
+    sections = sections_table([(0, gap_start), (gap_end, len(values) - gap_end)])
+
+    table = beats.compute_beats(df_num, fs_index, sections)
+    starts = table["time"] - table["interval"]
+    assert not np.any((starts < gap_start / fs_index) & (table["time"] >= gap_end / fs_index))
+    assert len(table) == pytest.approx(240 - 12, abs=3)
+
+def test_window_stats():
+    values = waveform(120)
+    df_num = pd.DataFrame({"Tip, fast": values}, index=pd.RangeIndex(len(values), name="Sample"))
+    table = beats.channel_beats(beats.compute_beats(df_num, fs_index), "Tip, fast")
+
+    stats = beats.window_stats(table, 10, 20)
+    in_window = (table["time"] >= 10) & (table["time"] <= 20)
+    assert stats["beats"] == in_window.sum() == pytest.approx(12, abs=1)
+    assert stats["bpm"]["mean"] == pytest.approx(72, abs=1)
+    assert beats.window_stats(table)["beats"] == len(table["time"])
+    assert beats.window_stats(table, 500, 600) is None
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:20:05 2026
+
+@author: agent
+
+BEAT - Tests of the byte-budget cache
+"""
+
+import numpy as np
+import bytecache
+
+def test_least_recently_used_are_evicted():
+    cache = bytecache.ByteCache(budget=2000)
+    cache.put("a", np.zeros(100))                       # 800 bytes
+    cache.put("b", (np.zeros(50), np.zeros(50)))        # 800 bytes
+    assert cache.get("a") is not None                   # "b" is now the least recently used
+    cache.put("c", np.zeros(100))
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.size == 1600
+
+    # An item larger than the budget is still kept, alone
+    cache.put("d", np.zeros(1000))
+    assert list(cache.items) == ["d"] and cache.size == 8000
+
+    cache.clear(lambda key: key == "d")
+    assert cache.size == 0 and cache.get("d") is None
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:05:13 2026
+
+@author: agent
+
+BEAT - Tests of the comparison
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import file_handler as fh
+import comparison as comp
+
+def test_load_column_cache(raw_log, monkeypatch):
+    '''
+    Cached columns are reloaded when the preprocessed file changes, and the cache stays within its budget.
+    '''
+    file_path = fh.preprocess_file(raw_log(n_rows=10000), export=True)
+    index, tb, first = comp.load_column(file_path, "Balloon, slow")
+    assert comp.load_column(file_path, "Balloon, slow")[2] is first
+    assert isinstance(index, pd.RangeIndex) and tb.n_rows == 10000
+
+    # Preprocess a different recording into the same file
+    fh.preprocess_file(raw_log(n_rows=8000, pressure=60), export=True)
+    mtime = fh.cache_mtime(file_path) + 10
+    os.utime(fh.blockstore.manifest_path(fh.blocks_path(file_path)), (mtime, mtime))
+    index, tb, values = comp.load_column(file_path, "Balloon, slow")
+    assert comp.load_column(file_path, "Tip, slow")[1] is tb
+    assert len(values) == 8000 and tb.n_rows == 8000 and values.min() < first.min()
+
+    monkeypatch.setattr(comp._cache, "budget", values.nbytes)
+    comp.load_column(file_path, "MAP")
+    assert comp._cache.size <= comp._cache.budget
+    assert np.isfinite(comp.align_offset(file_path, "inflation"))
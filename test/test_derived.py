@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:01:41 2026
+
+@author: agent
+
+BEAT - Tests of the derived signals
+"""
+
+import pytest
+import file_handler as fh
+import derived
+import summary
+
+def test_preprocess_two_recordings(raw_log):
+    '''
+    Recordings preprocessed in the same process must not get the derived signals of each other.
+    '''
+    first = fh.preprocess_file(raw_log("first.txt", n_rows=20000), export=True)
+    second = fh.preprocess_file(raw_log("second.txt", n_rows=12000, pressure=60), export=True)
+
+    df_num, _ = fh.read_preproc_data(second)
+    for name in derived.available_signals(df_num, list(derived.derived_signals)):
+        computed = derived.get_signal(None, df_num, name)
+        assert len(computed) == len(df_num)
+        assert computed.index.equals(df_num.index)
+
+    for file_path in (first, second):
+        stats = summary.load_summary(file_path)
+        assert stats
+
+@pytest.mark.parametrize("cache_format", ["blocks", "gzip"])
+def test_stored_signal_after_preprocessing_again(raw_log, monkeypatch, cache_format):
+    '''
+    Stored derived signals are served from the cache of the recording until it is preprocessed again.
+    '''
+    monkeypatch.setattr(fh, "cache_format", cache_format)
+    file_path = fh.preprocess_file(raw_log(n_rows=10000), export=True)
+    df_stored, _ = fh.read_preproc_data(file_path)
+    stored = derived.get_signal(file_path, df_stored, "MAP", store=True)
+    derived.clear_cache(file_path)
+    assert derived.read_stored_signal(file_path, "MAP", df_stored.index).equals(stored)
+
+    # The same recording preprocessed again from a shorter raw log
+    fh.preprocess_file(raw_log(n_rows=6000), export=True)
+    derived.clear_cache(file_path)
+    df_stored, _ = fh.read_preproc_data(file_path)
+    assert derived.read_stored_signal(file_path, "MAP", df_stored.index) is None
+    df = derived.add_signals(file_path, df_stored, ["MAP"])
+    assert len(df) == 6000 and not df.isna().any().any()
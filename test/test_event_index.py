@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:05:53 2026
+
+@author: agent
+
+BEAT - Tests of the event index
+"""
+
+import file_handler as fh
+import event_index
+
+def test_reingest_and_like_escape(raw_log, tmp_path):
+    raw_log()
+    conn = event_index.build_index(str(tmp_path))
+    file_path = event_index.find_recordings(str(tmp_path))[0]
+
+    # Unchanged recordings are skipped, unless they were indexed by another BEAT SW version
+    assert not event_index.ingest_recording(conn, file_path)
+    conn.execute("UPDATE recordings SET beat_sw = ?", ("2024_01_01__1",))
+    assert event_index.ingest_recording(conn, file_path)
+    assert conn.execute("SELECT beat_sw FROM recordings").fetchone()[0] == fh.sw_version
+
+    # % and _ are not wildcards in the search text
+    assert event_index.query_messages(conn, "Low pressure")
+    assert not event_index.query_messages(conn, "%")
+    assert not event_index.query_messages(conn, "Low_pressure")
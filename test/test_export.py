@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:05:32 2026
+
+@author: agent
+
+BEAT - Tests of the export
+"""
+
+import io
+import csv
+import numpy as np
+import pandas as pd
+import export as exp
+
+def window():
+    df_num = pd.DataFrame({"Systolic": np.arange(100, 110)}, index=pd.RangeIndex(0, 10, name="Sample"))
+    df_text = pd.DataFrame({"Alarm": [np.nan] * 4 + ["Low pressure; check"] + [np.nan] * 5}, index=df_num.index)
+    events = [{"type": "Alarm", "label": 'Low pressure; "check"', "start": 0.08, "end": 0.1}]
+    return df_num, df_text, events
+
+def test_csv_quotes_separators():
+    df_num, df_text, events = window()
+    text = "".join(exp.export_window(df_num, df_text, events, ["Systolic", "Alarm"], fmt="csv"))
+    rows = list(csv.reader(io.StringIO(text), delimiter=";"))
+
+    assert rows[0] == ["# Event", "Alarm", 'Low pressure; "check"', "0.08", "0.1"]
+    assert rows[1] == ["Time", "Systolic", "Alarm"]
+    assert rows[2] == ["0.0", "100", ""]
+    assert rows[6] == ["0.08", "104", "Low pressure; check"]
+    assert len(rows) == 12
+
+def test_npz_missing_text():
+    df_num, df_text, events = window()
+    data = np.load(io.BytesIO(b"".join(exp.export_window(df_num, df_text, events, ["Alarm"], fmt="npz"))))
+
+    assert data["Alarm"].tolist() == [""] * 4 + ["Low pressure; check"] + [""] * 5
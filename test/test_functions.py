@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:04:05 2026
+
+@author: agent
+
+BEAT - Tests of the plot
+"""
+
+import base64
+import numpy as np
+import pandas as pd
+import functions as func
+
+def decode(typed):
+    return np.frombuffer(base64.b64decode(typed["bdata"]), dtype=typed["dtype"])
+
+def frame(samples):
+    return pd.DataFrame({"State": np.full(len(samples), 30), "Balloon, slow": np.arange(len(samples))},
+                        index=pd.Index(samples, name="Sample"))
+
+def test_dropped_rows_are_filled():
+    '''
+    Dropped rows do not split the lines, the missing samples are sent as NaN.
+    '''
+    samples = np.delete(np.arange(1000, 2000), np.arange(3, 1000, 7))
+    fig = func.display_figure(frame(samples), "test")
+
+    assert len(fig.data) == 2
+    trace = fig.data[1]
+    assert trace.x0 == 20.0 and trace.x is None
+    y = decode(trace.y)
+    assert len(y) == 1000 and np.isnan(y).sum() == 1000 - len(samples)
+    assert np.array_equal(y[samples - 1000], np.arange(len(samples)))
+
+def test_split_at_gaps_only():
+    '''
+    The lines are split at the gaps, sparse parts are sent with their time array.
+    '''
+    samples = np.concatenate((np.arange(0, 500), np.arange(1000, 3000, 10)))
+    fig = func.display_figure(frame(samples), "test", gaps=np.array([500]))
+
+    assert len(fig.data) == 4
+    assert fig.data[0].x0 == 0.0 and len(decode(fig.data[0].y)) == 500
+    assert np.allclose(decode(fig.data[1].x), samples[500:] / 50)
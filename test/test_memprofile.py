@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:07:15 2026
+
+@author: agent
+
+BEAT - Memory check of the preprocessing and loading
+"""
+
+import tracemalloc
+import memprofile
+
+def test_memory_per_million_rows(raw_log, monkeypatch):
+    '''
+    Peak traced memory of preprocessing a raw log and loading the cache, per million rows (see memprofile.py).
+    '''
+    monkeypatch.setattr(memprofile, "stages", [])
+    monkeypatch.setattr(memprofile, "memory_budget", 0)
+    try:
+        results = memprofile.check_recording(raw_log(n_rows=20000))
+    finally:
+        tracemalloc.stop()
+
+    print(memprofile.report())
+    assert set(results) == {"preprocess", "load"}
+    for name, (value, limit) in results.items():
+        assert 0 < value <= limit, f"{name}: {value:.0f} MB per million rows (limit: {limit} MB)"
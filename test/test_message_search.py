@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:41:16 2026
+
+@author: agent
+
+BEAT - Tests of the message search
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import message_search
+
+fs_index = 50
+
+@pytest.fixture
+def message_index():
+    '''
+    Index of a short recording: rows of Alarm, UI and Comment messages (50 rows per second).
+    '''
+    df_text = pd.DataFrame(np.nan, index=pd.RangeIndex(1000, name="Sample"), columns=["Comment", "Alarm", "UI", "Wire"], dtype=object)
+    df_text.loc[[0, 1, 2, 100, 400], "Alarm"] = "Low pressure"     # Repeats 2 s apart are one segment, 6 s apart are not
+    df_text.loc[600, "Alarm"] = "pressure LOW battery"
+    df_text.loc[50, "UI"] = "Inflate, pressed"
+    df_text.loc[700, "Comment"] = "50% done_x"
+    return message_search.build_index(df_text, fs_index)
+
+def found(message_index, query, **kwargs):
+    hits, _, _ = message_search.search(message_index, query, **kwargs)
+    return [(hit["channel"], hit["message"], hit["start_ms"], hit["end_ms"]) for hit in hits]
+
+def test_segments(message_index):
+    assert found(message_index, "low pressure") == [("Alarm", "Low pressure", 0, 2000), ("Alarm", "Low pressure", 8000, 8000)]
+    assert message_search.format_ms(62500) == "01:02.500"
+
+def test_substring_queries(message_index):
+    # Case-insensitive, and a message with every trigram of the query but not the query itself does not match
+    assert [hit[1] for hit in found(message_index, "LOW PRESSURE")] == ["Low pressure", "Low pressure"]
+    assert [hit[1] for hit in found(message_index, "pressure low")] == ["pressure LOW battery"]
+
+    # Queries shorter than a trigram check every message
+    assert [hit[1] for hit in found(message_index, "lo")] == ["Low pressure", "Low pressure", "pressure LOW battery"]
+    assert [hit[1] for hit in found(message_index, "%")] == ["50% done_x"]
+    assert found(message_index, "") == []
+    assert found(message_index, "no such message") == []
+
+def test_regex_and_channels(message_index):
+    assert [hit[1] for hit in found(message_index, "^low", regex=True)] == ["Low pressure", "Low pressure"]
+    assert [hit[1] for hit in found(message_index, "press", channels=["UI"])] == ["Inflate, pressed"]
+    assert found(message_index, "press", channels=["Wire"]) == []
+    with pytest.raises(ValueError):
+        message_search.search(message_index, "(unclosed", regex=True)
+
+def test_paging(message_index, monkeypatch):
+    monkeypatch.setattr(message_search, "page_size", 2)
+    hits, total, page = message_search.search(message_index, "e", page=1)
+    assert (len(hits), total, page) == (2, 5, 1)
+    assert [hit["start_ms"] for hit in hits] == [8000, 12000]
+
+    # A page after the last one is moved to the last page, a negative page to the first one
+    hits, total, page = message_search.search(message_index, "e", page=7)
+    assert (len(hits), page) == (1, 2) and hits[0]["start_ms"] == 14000
+    assert message_search.search(message_index, "e", page=-1)[2] == 0
+    assert message_search.search(message_index, "no such message", page=3) == ([], 0, 0)
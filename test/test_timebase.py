@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:02:32 2026
+
+@author: agent
+
+BEAT - Tests of the time base
+"""
+
+import numpy as np
+import pytest
+import file_handler as fh
+import timebase
+import summary
+
+def test_missing_index_values(raw_log):
+    '''
+    Missing Index values leave a hole in the time axis instead of shifting the rest of the section.
+    '''
+    file_path = fh.preprocess_file(raw_log(n_rows=20000, missing=range(5000, 5500)), export=True)
+    sections = fh.read_sections(file_path)
+    df_num, _ = fh.read_preproc_data(file_path)
+    tb = timebase.TimeBase.from_index(df_num.index, fh.fs_index)
+
+    assert sections["first_index"].tolist() == [0, 5500, 0]
+    assert sections["start_sample"].tolist() == [0, 5500, 10000]
+    assert sections["gap"].tolist() == [False, True, True]
+
+    # Part 2 starts at Index 5500 (110 s), the second section continues after the last sample of the first one (200 s)
+    starts = timebase.gap_rows(sections, df_num.index)
+    assert np.allclose(tb.time(starts), [110.0, 200.0])
+    assert tb.n_rows == 19500
+    assert timebase.section_bounds(sections, df_num.index) == [(0, 5000), (5000, 9500), (9500, 19500)]
+    assert summary.load_summary(file_path)["duration"] == pytest.approx(tb.duration) == pytest.approx(399.98)
+
+@pytest.mark.parametrize("line", ["Data:17;0;0;x", "Data:17;0;0;"])
+def test_corrupted_index(raw_log, line):
+    '''
+    A row with a garbled Index does not create gaps: it is dropped by convert_data (corrupted field) or removed
+    because it breaks the order of the section.
+    '''
+    file_path = raw_log(n_rows=20000)
+    with open(file_path, encoding="utf-8") as file:
+        text = file.read()
+    with open(file_path, mode="w", encoding="utf-8") as file:
+        file.write(text.replace("Data:5002;0;0;", line, 1))
+
+    file_path = fh.preprocess_file(file_path, export=True)
+    sections = fh.read_sections(file_path)
+    df_num, _ = fh.read_preproc_data(file_path)
+    tb = timebase.TimeBase.from_index(df_num.index, fh.fs_index)
+
+    assert sections["gap"].tolist() == [False, True]
+    assert sections["rows"].tolist() == [10000, 10000]
+    assert len(df_num) == 19999 and 5002 not in df_num.index
+    assert tb.duration == pytest.approx(399.98)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:32:52 2026
+
+@author: agent
+
+BEAT - Integer time base
+
+The data is indexed by the integer sample index. Sampling is uniform within a section,
+so the time of a row (and the rows of a time range) can be computed from the section
+start rows, sample offsets and rates, without a float time array.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+
+class TimeBase:
+    '''
+    Sections of uniformly sampled rows. For every section: first row, sample index of the
+    first row and sampling rate (samples per second), all integers.
+    '''
+    def __init__(self, n_rows, rate, starts=(0,), offsets=(0,), rates=None):
+        self.n_rows = int(n_rows)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.rates = np.asarray(rates if rates is not None else [rate] * len(self.starts), dtype=np.int64)
+        self.ends = np.append(self.starts[1:], self.n_rows)
+        self.section_times = self.offsets / self.rates
+
+    @classmethod
+    def from_index(cls, index, rate):
+        '''
+        Time base of a sample-indexed DataFrame. A new section starts wherever the sample index is not continuous.
+        '''
+        if isinstance(index, pd.RangeIndex) and index.step == 1:
+            return cls(len(index), rate, offsets=(index.start,))
+        samples = index.to_numpy()
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(samples) != 1) + 1)) if len(samples) else np.array([0])
+        offsets = samples[starts] if len(samples) else np.array([0])
+        return cls(len(samples), rate, starts=starts, offsets=offsets)
+
+    def section(self, rows):
+        return np.clip(np.searchsorted(self.starts, rows, side="right") - 1, 0, len(self.starts) - 1)
+
+    def time(self, rows):
+        '''
+        Time (s) of the given row(s).
+        '''
+        i = self.section(rows)
+        return (self.offsets[i] + (np.asarray(rows) - self.starts[i])) / self.rates[i]
+
+    def times(self, rows=slice(None)):
+        '''
+        Float time array of a row slice, generated on demand (it is not kept in memory).
+        '''
+        start, stop, _ = rows.indices(self.n_rows)
+        return self.time(np.arange(start, stop))
+
+    def row(self, time, side="left"):
+        '''
+        First row at or after the time (side="left"), or the row after the last row at or before the time (side="right").
+        '''
+        i = int(np.clip(np.searchsorted(self.section_times, time, side="right") - 1, 0, len(self.starts) - 1))
+
+        # Sample position within the section, rounded to avoid float drift on long recordings
+        position = round(float(time) * int(self.rates[i]) - int(self.offsets[i]), 6)
+        if side == "left":
+            row = self.starts[i] + math.ceil(position)
+        else:
+            row = self.starts[i] + math.floor(position) + 1
+        return int(np.clip(row, self.starts[i], self.ends[i]))
+
+    def slice(self, x_min=None, x_max=None):
+        '''
+        Row slice of the [x_min, x_max] time range, computed with arithmetic only.
+        '''
+        start = 0 if x_min is None else self.row(x_min, side="left")
+        stop = self.n_rows if x_max is None else self.row(x_max, side="right")
+        return slice(start, max(start, stop))
+
+    @property
+    def duration(self):
+        return float(self.time(self.n_rows - 1)) if self.n_rows else 0.0
+
+def compact_index(index):
+    '''
+    Replace a continuous sample index by a RangeIndex, which does not store the values.
+    '''
+    if len(index) and not isinstance(index, pd.RangeIndex):
+        samples = index.to_numpy()
+        if samples[-1] - samples[0] == len(samples) - 1 and np.all(np.diff(samples) == 1):
+            return pd.RangeIndex(samples[0], samples[-1] + 1, name=index.name)
+    return index
+
+def section_bounds(sections, index, include=None, skip_gaps=False):
+    '''
+    Row ranges of the sections of a sample-indexed DataFrame (binary search on the index, no data is scanned).
+    include: section table rows (positions) to keep, skip_gaps: drop the parts that follow a gap.
+    '''
+    bounds = []
+    for i, part in enumerate(sections.itertuples()):
+        if (include is not None and i not in include) or (skip_gaps and part.gap):
+            continue
+        start = int(index.searchsorted(part.start_sample, side="left"))
+        end = int(index.searchsorted(part.start_sample + part.rows, side="left"))
+        if end > start:
+            bounds.append((start, end))
+    return bounds
+
+def gap_rows(sections, index):
+    '''
+    Rows of a sample-indexed DataFrame where a part starts after a gap.
+    '''
+    gaps = sections[sections["gap"]]
+    return index.searchsorted(gaps["start_sample"].to_numpy(), side="left")
+
+def continuous_bounds(sections, index):
+    '''
+    Row ranges between the gaps of a sample-indexed DataFrame.
+    '''
+    edges = np.unique(np.concatenate(([0], gap_rows(sections, index), [len(index)])))
+    return [(int(start), int(end)) for start, end in zip(edges[:-1], edges[1:])]